@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of rendering an announcement's attendee list.
+
+Compares the previous renderer (growing the string with += and escaping
+every handle on every render) with joining the handles kept escaped in the
+members index, and times the full generate_announcement_message, for events
+with 10, 100 and 1000 attendees.
+
+Run from the repository root:
+    python benchmarks/bench_announcement.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import main  # noqa: F401  (imports the modules in the order the bot does)
+from event_admin.announcement import generate_announcement_message
+from event_admin.members import escaped_handles
+from utils.markdown import escape_markdown_v2
+
+SIZES = (10, 100, 1000)
+
+
+def make_event(attendees: int) -> dict:
+    return {
+        "id": 1,
+        "name": "Benchmark Event",
+        "date": "2026-11-01",
+        "start_time": "19:00",
+        "end_time": "22:00",
+        "location": "Hall",
+        "location_link": "None",
+        "has_capacity": True,
+        "capacity": attendees,
+        "announcement_text": "Come along\\!",
+        "attendees": [{"user_id": n, "username": f"pup_{n}.name"} for n in range(attendees)],
+        "waitlist": [],
+    }
+
+
+def old_handle_list(entries: list) -> str:
+    text = ""
+    for i in range(len(entries) - 1):
+        text += escape_markdown_v2(f"@{entries[i]['username']}, ")
+    text += escape_markdown_v2(f"@{entries[-1]['username']}")
+    return text
+
+
+def new_handle_list(event: dict) -> str:
+    return ", ".join(escaped_handles(event, "attendees"))
+
+
+def bench(func, number: int) -> float:
+    """Best time of one call in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main_bench():
+    print(f"{'attendees':>10} {'old list':>12} {'new list':>12} {'speedup':>8} {'announcement':>14}")
+    for size in SIZES:
+        event = make_event(size)
+        entries = event["attendees"]
+        assert old_handle_list(entries) == new_handle_list(event)
+        number = max(1, 20000 // size)
+        old = bench(lambda: old_handle_list(entries), number)
+        new = bench(lambda: new_handle_list(event), number)
+        full = bench(lambda: generate_announcement_message(None, event), number)
+        print(f"{size:>10} {old:>10.1f}us {new:>10.1f}us {old / new:>7.1f}x {full:>12.1f}us")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,50 @@
+"""
+Micro-benchmark of MarkdownV2 escaping.
+
+Compares the regex escaper that announcement.py and rsvp_admin.py each had
+with utils.markdown.escape_markdown_v2 (translate table for short text, returns text with
+nothing to escape unchanged) and escape_value (memoized).
+
+Run from the repository root:
+    python benchmarks/bench_markdown.py
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils.markdown import escape_markdown_v2, escape_value
+
+SAMPLES = {
+    "plain username": "victoriapup",
+    "username with _": "pup_of_victoria",
+    "event name": "Pup Night (Halloween Edition) - 18+!",
+    "paragraph": "Join us for a night out. Doors open at 7pm - bring a friend! " * 20,
+}
+
+
+def old_escape_markdown_v2(text: str) -> str:
+    pattern = r'([\_\*\[\]\(\)\~\`\>\#\+\-\=\|\{\}\.\!])'
+    return re.sub(pattern, r'\\\1', text)
+
+
+def bench(func, text: str, number: int = 20000) -> float:
+    """Best time of one call in nanoseconds."""
+    return min(timeit.repeat(lambda: func(text), number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    print(f"{'sample':>16} {'regex':>10} {'shared':>10} {'memoized':>10}")
+    for name, text in SAMPLES.items():
+        assert old_escape_markdown_v2(text) == escape_markdown_v2(text) == escape_value(text)
+        old = bench(old_escape_markdown_v2, text)
+        new = bench(escape_markdown_v2, text)
+        cached = bench(escape_value, text)
+        print(f"{name:>16} {old:>8.0f}ns {new:>8.0f}ns {cached:>8.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,9 @@ from event_admin.constants import (
     RSVP_MENU,
     MESSAGE_RSVP_WHOM,
     MESSAGE_RSVP_INPUT,
-    ASK_CLOSE_EVENT
+    ASK_CLOSE_EVENT,
+    ARCHIVED_EVENTS,
+    VIEW_ATTENDEES
 )
 
 # Callback data constants
@@ -65,7 +67,7 @@ BACK_TO_RSVP_MENU = "back_to_rsvp_menu"
 
 
 # Then import these modules.
-from event_admin import menu, edit_event, announcement, rsvp_admin, close
+from event_admin import menu, edit_event, announcement, rsvp_admin, close, archive
 import rsvp
 
 
@@ -136,7 +138,7 @@ def get_eventadmin_handlers():
                 CallbackQueryHandler(menu.rsvp_menu_callback)
                 ],
             MESSAGE_RSVP_WHOM: [
-                CallbackQueryHandler(rsvp_admin.message_rsvp_whom_callback, pattern='^(msg_attendees|msg_waitlist)$'),
+                CallbackQueryHandler(rsvp_admin.message_rsvp_whom_callback, pattern='^(msg_attendees|msg_waitlist|msg_both)$'),
                 CallbackQueryHandler(menu.event_menu_callback, pattern='^'+BACK_TO_RSVP_MENU+'$'),
             ],
             MESSAGE_RSVP_INPUT: [
@@ -146,6 +148,14 @@ def get_eventadmin_handlers():
             ],
             ASK_CLOSE_EVENT: [
                 CallbackQueryHandler(close.ask_to_close_event_callback)
+            ],
+            ARCHIVED_EVENTS: [
+                CallbackQueryHandler(archive.archived_events_callback)
+            ],
+            VIEW_ATTENDEES: [
+                # A username (or the start of one) jumps to the page it is on
+                MessageHandler(filters.TEXT & ~filters.COMMAND, rsvp_admin.find_attendee_input),
+                CallbackQueryHandler(rsvp_admin.attendee_page_callback)
             ]
         },
         fallbacks=[CommandHandler("stop", stop_command)],
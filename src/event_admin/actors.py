@@ -0,0 +1,91 @@
+# event_admin/actors.py
+
+import asyncio
+import functools
+import time
+from utils import metrics
+
+# Every event owns a queue of pending mutations that are run one at a time, in
+# the order they arrived. Updates for different events run in parallel, but two
+# RSVPs for the same event can never interleave around an await (for example
+# both passing the capacity check before either is added to the attendees).
+_actors = {}
+
+
+class EventActor:
+    """Runs coroutine functions for one event one after another."""
+
+    def __init__(self, event_id: int):
+        self.event_id = event_id
+        self._queue = asyncio.Queue()
+        self._worker = None
+
+    def submit(self, func, *args) -> asyncio.Future:
+        """Queue `func(*args)` and return a future for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((func, args, future, time.perf_counter()))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+        return future
+
+    async def _drain(self):
+        # The worker stops when the queue is empty and is started again by the
+        # next submit, so idle events don't keep a task alive.
+        try:
+            while not self._queue.empty():
+                func, args, future, queued_at = self._queue.get_nowait()
+                if future.cancelled():
+                    continue
+                metrics.observe("event_queue_wait", time.perf_counter() - queued_at)
+                metrics.increment("event_mutations")
+                try:
+                    result = await func(*args)
+                except Exception as ex:
+                    if not future.done():
+                        future.set_exception(ex)
+                except BaseException as ex:
+                    # The worker was cancelled (e.g. at shutdown) or func raised
+                    # something that stops it; the waiting caller still gets an answer.
+                    if not future.done():
+                        if isinstance(ex, asyncio.CancelledError):
+                            future.cancel()
+                        else:
+                            future.set_exception(ex)
+                    raise
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            # Nothing would run what is still queued if the worker stopped early
+            while not self._queue.empty():
+                _, _, future, _ = self._queue.get_nowait()
+                future.cancel()
+            if _actors.get(self.event_id) is self and self._queue.empty():
+                del _actors[self.event_id]
+
+
+async def run_serially(event_id: int, func, *args):
+    """
+    Run `func(*args)` in the event's queue and return its result.
+    Must not be called from something that is already running in the same
+    event's queue, as it would wait for itself.
+    """
+    actor = _actors.get(event_id)
+    if actor is None:
+        actor = _actors[event_id] = EventActor(event_id)
+    return await actor.submit(func, *args)
+
+
+def serial_per_event(handler):
+    """
+    Decorator for callback query handlers whose callback data ends in
+    ":<event_id>". The handler runs in that event's queue.
+    """
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        try:
+            event_id = int(update.callback_query.data.rsplit(":", 1)[1])
+        except (IndexError, ValueError):
+            return await handler(update, context)
+        return await run_serially(event_id, handler, update, context)
+    return wrapper
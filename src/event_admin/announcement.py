@@ -3,14 +3,19 @@ import os
 sys.path.append("..")
 import asyncio
 import re
-from datetime import date, time, datetime
+from datetime import date, time, datetime, timedelta, timezone
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup
 )
 from telegram.ext import ContextTypes, ConversationHandler, CallbackQueryHandler, MessageHandler, filters, Application
 from telegram.constants import ParseMode
 from telegram.helpers import escape_markdown
-from event_admin.data_manager import save_events, save_working_event
+from event_admin.data_manager import save_working_event, save_edited_event, save_event, get_event
+from event_admin.actors import run_serially
+from event_admin.announcement_updates import edit_if_changed, remember_rendered
+from utils.outbound import PRIORITY_ANNOUNCEMENT
+from utils import metrics
+from event_admin.members import escaped_handles
 from event_admin import menu, edit_event
 from event_admin.constants import (
     MAIN_MENU,
@@ -29,8 +34,13 @@ from event_admin.constants import (
     ANNOUNCEMENT_EDIT_ANNOUNCEMENT_TEXT,
     ANNOUNCEMENT_EDIT_POSTED_ANNOUNCEMENT_TEXT
 )
+from config import config
 from config.config import chat_ids
 from rsvp import rsvp_header_text
+from event_admin.render_cache import cached_render
+# Seconds between posting the announcement and posting the RSVP button in the group chat.
+GROUP_BUTTON_DELAY = getattr(config, "group_button_delay", 5)
+
 # Callback data constants
 CANCEL_NEW_EVENT        = "cancel_new_event"
 EDIT_NAME               = "edit_name"
@@ -60,15 +70,34 @@ PREVIEW_ANNOUNCEMENT = "preview_announcement"
 EDIT_POSTED_ANNOUNCEMENT_TEXT = "edit_posted_announcement_text"
 BACK_TO_EVENT_MENU = "back_to_event_menu"
 
-def escape_markdown_v2(text: str) -> str:
-    """
-    Escapes Markdown V2 special characters in the given text.
-    See: https://core.telegram.org/bots/api#markdownv2-style
-    """
-    # Characters that must be escaped in MarkdownV2:
-    # _ * [ ] ( ) ~ ` > # + - = | { } . !
-    pattern = r'([\_\*\[\]\(\)\~\`\>\#\+\-\=\|\{\}\.\!])'
-    return re.sub(pattern, r'\\\1', text)
+# Telegram's limit for the text of one message. The MarkdownV2 source is
+# measured, which is never shorter than what Telegram counts (the text after
+# the formatting is parsed).
+MESSAGE_LIMIT = 4096
+
+# Room kept free of announcement text for the attendee and waitlist titles
+# and, at worst, "N pups" in place of each handle list.
+HANDLE_LISTS_RESERVE = 80
+
+# Admins are warned once an announcement is this long.
+LENGTH_WARNING = getattr(config, "announcement_length_warning", 3600)
+
+# event_id -> {"length": characters of the last render, "hidden": handles left out of it}
+_announcement_lengths = {}
+
+# Events whose admin was already sent a length warning
+_length_warned = set()
+
+# The same for every announcement
+ANNOUNCEMENT_FOOTER = (
+    "_*To RSVP:*_\n"
+    "\- _Make sure that you have messaged @VictoriaPups\_events\_bot before\._\n"
+    "\- _Press the RSVP button below\._\n"
+    "\- _You will receive a confirmation message from @VictoriaPups\_events\_bot if you are successfully RSVP'd\._\n"
+    "\- _If you are unable to attend, please press the Cancel RSVP button in your confirmation message\._\n"
+    "\- _Please message @Repeating1s if you have any questions or need help\._\n\n"
+    "_*Note: The bot can only message you and accept your RSVP if you have started a conversation with it first\.*_\n"
+)
 
 
 async def show_announcement_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, edit=True):
@@ -108,8 +137,11 @@ async def show_announcement_menu(update: Update, context: ContextTypes.DEFAULT_T
         f"Location: {event_data.get('location')}\n"
         f"Capacity: {event_data.get('capacity', 'None')}\n"
         f"Announcement: {event_data['announcement_state']}\n"
-        "\nWhat would you like to do?"
     )
+    warning = announcement_length_warning(event_data)
+    if warning:
+        text += f"\n{warning}\n"
+    text += "\nWhat would you like to do?"
     
     query = update.callback_query
     # Edit or send a new message
@@ -165,13 +197,33 @@ async def edit_announcement_text_input(update: Update, context: ContextTypes.DEF
 
     announcement_text = announcement_text.strip()
 
+    if len(announcement_text) > announcement_text_limit(context.user_data["working_event"]):
+        await reply_text_too_long(update, context, announcement_text)
+        return ANNOUNCEMENT_EDIT_ANNOUNCEMENT_TEXT
+
     context.user_data["working_event"]["announcement_state"] = "Text Saved"
     context.user_data["working_event"]["announcement_text"] = announcement_text
-    save_working_event(context)
+    save_edited_event(context)
 
     await update.message.reply_text("Announcement text updated.")
     return await show_announcement_menu(update, context)
 
+def announcement_text_limit(event_data: dict) -> int:
+    """
+    Longest announcement text (MarkdownV2 source) that still leaves room in
+    one Telegram message for the rest of the announcement.
+    """
+    head = render_announcement_head(dict(event_data, announcement_text=""))
+    return MESSAGE_LIMIT - len(head) - len(ANNOUNCEMENT_FOOTER) - HANDLE_LISTS_RESERVE
+
+async def reply_text_too_long(update: Update, context: ContextTypes.DEFAULT_TYPE, announcement_text: str) -> None:
+    """Ask for a shorter announcement text; the admin's message is not saved."""
+    limit = announcement_text_limit(context.user_data["working_event"])
+    await update.message.reply_text(
+        f"That text is {len(announcement_text)} characters, but the announcement only has room for {limit} "
+        "(formatting counts too). Please send a shorter text."
+    )
+
 async def edit_announcement_text_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle 'None' or '<< Back' for announcement text."""
     query = update.callback_query
@@ -182,7 +234,7 @@ async def edit_announcement_text_callback(update: Update, context: ContextTypes.
         context.user_data["working_event"]["announcement_state"] = "None"
         context.user_data["working_event"]["announcement_text"] = ""
 
-        save_working_event(context)
+        save_edited_event(context)
 
         await query.edit_message_text("Announcement text set to None.")
         return await show_announcement_menu(update, context)
@@ -217,53 +269,149 @@ def generate_announcement_message(context: ContextTypes.DEFAULT_TYPE, event_data
     # if event_data["location"] != "None":
     #     text += f"*Location: {event_data['location']}*\n"
     
+    attendees = event_data["attendees"]
+    waitlist = event_data["waitlist"]
+    head = cached_render(event_data, "announcement_head", render_announcement_head)
+    if event_data['has_capacity']:
+        attending_title = f"*Attending: {len(attendees)}/{event_data['capacity']}*\n"
+    else:
+        attending_title = f"*Attending: {len(attendees)}*\n"
+    waitlist_title = f"\n*Waitlist: {len(waitlist)}*\n" if waitlist else ""
+
+    # Everything except the handle lists, so the lists can be fitted into
+    # what is left of Telegram's message limit before anything is joined.
+    fixed_length = (
+        len(head) + len(attending_title) + len(waitlist_title) + len(ANNOUNCEMENT_FOOTER)
+        + 1 + bool(attendees) + bool(waitlist)  # the newlines after the lists
+    )
+    attendee_list, waitlist_list, hidden = fit_handle_lists(
+        escaped_handles(event_data, "attendees"), escaped_handles(event_data, "waitlist"), MESSAGE_LIMIT - fixed_length
+    )
+
+    # The parts are joined once at the end instead of growing one string.
+    parts = [head, attending_title]
+    if attendees:
+        parts += [attendee_list, "\n"]
+    if waitlist:
+        parts += [waitlist_title, waitlist_list, "\n"]
+    parts += ["\n", ANNOUNCEMENT_FOOTER]
+    text = "".join(parts)
+
+    record_announcement_length(event_data, len(text), hidden)
+    return text, announcement_keyboard(event_data)
+
+def render_handle_list_within(handles: list, budget: int):
+    """
+    The escaped handles separated by commas, e.g. "@a, @b, @c", in at most
+    `budget` characters: the handles that don't fit are replaced by
+    "and N more". Returns (text, number hidden).
+    """
+    text = ", ".join(handles)
+    if len(text) <= budget:
+        return text, 0
+
+    # Room for the longest possible ", and N more"
+    budget -= len(f", and {len(handles)} more")
+    shown = []
+    used = 0
+    for handle in handles:
+        length = len(handle) + (2 if shown else 0)
+        if used + length > budget:
+            break
+        shown.append(handle)
+        used += length
+    hidden = len(handles) - len(shown)
+    if not shown:
+        summary = f"{hidden} pups"
+        return (summary if len(summary) <= budget else ""), hidden
+    return f"{', '.join(shown)}, and {hidden} more", hidden
+
+def fit_handle_lists(attendees: list, waitlist: list, budget: int):
+    """
+    Render the escaped attendee and waitlist handles in at most `budget`
+    characters. If both don't fit, the waitlist gets up to a quarter of the
+    space and the attendees the rest. Returns (attendee text, waitlist text,
+    number hidden).
+    """
+    attendee_text = ", ".join(attendees)
+    waitlist_text = ", ".join(waitlist)
+    if len(attendee_text) + len(waitlist_text) <= budget:
+        return attendee_text, waitlist_text, 0
+
+    waitlist_budget = min(len(waitlist_text), budget // 4)
+    attendee_text, attendees_hidden = render_handle_list_within(attendees, budget - waitlist_budget)
+    waitlist_budget = budget - len(attendee_text)
+    waitlist_text, waitlist_hidden = render_handle_list_within(waitlist, waitlist_budget)
+    return attendee_text, waitlist_text, attendees_hidden + waitlist_hidden
+
+def record_announcement_length(event_data: dict, length: int, hidden: int) -> None:
+    _announcement_lengths[event_data["id"]] = {"length": length, "hidden": hidden}
+    if hidden:
+        metrics.increment("announcement_renders_truncated")
+
+def forget_announcement_lengths(event_id: int) -> None:
+    """Drop what is remembered about the event's announcement length, e.g. once it is archived."""
+    _announcement_lengths.pop(event_id, None)
+    _length_warned.discard(event_id)
+
+def announcement_length_warning(event_data: dict):
+    """
+    A warning for admins if the event's last rendered announcement is over or
+    close to Telegram's message limit or had to hide handles, otherwise None.
+    """
+    rendered = _announcement_lengths.get(event_data["id"])
+    if rendered is None:
+        return None
+    if rendered["length"] > MESSAGE_LIMIT:
+        return (
+            f"⚠️ The announcement is {rendered['length']} characters, more than Telegram's limit of "
+            f"{MESSAGE_LIMIT}, so it can no longer be posted or edited. Shorten the announcement text."
+        )
+    if rendered["hidden"]:
+        return (
+            f"⚠️ The announcement is too long for one Telegram message, so {rendered['hidden']} "
+            "handles are left out of it. Use View Attendees in the RSVP menu to see everyone."
+        )
+    if rendered["length"] >= LENGTH_WARNING:
+        return (
+            f"⚠️ The announcement is {rendered['length']} of {MESSAGE_LIMIT} characters. "
+            "Once it is full, new handles will be shown as \"and N more\"."
+        )
+    return None
+
+async def warn_admin_about_length(context: ContextTypes.DEFAULT_TYPE, event_data: dict) -> None:
+    """Send the length warning to the admin who posted the announcement, once per event."""
+    warning = announcement_length_warning(event_data)
+    admin_chat_id = event_data.get("group_rsvp_button_admin_chat_id")
+    if warning is None or not admin_chat_id or event_data["id"] in _length_warned:
+        return
+    _length_warned.add(event_data["id"])
+    try:
+        await context.bot.send_message(admin_chat_id, f"{event_data['name']}: {warning}")
+    except Exception as ex:
+        print(f"[Announcement] Could not send length warning: {ex}")
+
+def render_announcement_head(event_data: dict) -> str:
+    """The part of the announcement above the attendee list."""
     text = "📢  " + rsvp_header_text(event_data)
     if event_data["has_capacity"]:
         text += f"*Capacity: {event_data['capacity']}*\n"
     text += f"\n"
 
     text += f"{event_data['announcement_text']}\n\n"
+    return text
 
-    if event_data['has_capacity']:
-        text += f"*Attending: {len(event_data['attendees'])}/{event_data['capacity']}*\n"
-    else:
-        text += f"*Attending: {len(event_data['attendees'])}*\n"
-    
-    if len(event_data["attendees"]) > 0:
-        for i in range(len(event_data["attendees"])-1):
-            text += escape_markdown_v2(f"@{event_data['attendees'][i]['username']}, ")
-        text += escape_markdown_v2(f"@{event_data['attendees'][-1]['username']}")
-        text += "\n"
-    
-    if len(event_data["waitlist"]) > 0:
-        text += "\n"
-        text += f"*Waitlist: {len(event_data['waitlist'])}*\n"
-        for i in range(len(event_data['waitlist'])-1):
-            text += escape_markdown_v2(f"@{event_data['waitlist'][i]['username']}, ")
-        text += escape_markdown_v2(f"@{event_data['waitlist'][-1]['username']}")
-        text += "\n"
-    
-    text += "\n"
-        
-    text += ("_*To RSVP:*_\n"
-             "\- _Make sure that you have messaged @VictoriaPups\_events\_bot before\._\n"
-             "\- _Press the RSVP button below\._\n"
-             "\- _You will receive a confirmation message from @VictoriaPups\_events\_bot if you are successfully RSVP'd\._\n"
-             "\- _If you are unable to attend, please press the Cancel RSVP button in your confirmation message\._\n"
-             "\- _Please message @Repeating1s if you have any questions or need help\._\n\n"
-             "_*Note: The bot can only message you and accept your RSVP if you have started a conversation with it first\.*_\n"
-             )
-    
-    if not event_data["has_capacity"]:
-        buttons = [[InlineKeyboardButton("RSVP", callback_data=f"rsvp:{event_data['id']}")]]
-    elif len(event_data["attendees"]) < event_data["capacity"]:
-        buttons = [[InlineKeyboardButton("RSVP", callback_data=f"rsvp:{event_data['id']}")]]
+def announcement_keyboard(event_data: dict) -> InlineKeyboardMarkup:
+    """The RSVP button of the announcement and the group message, "Join Waitlist" once the event is full."""
+    if event_data["has_capacity"] and len(event_data["attendees"]) >= event_data["capacity"]:
+        label = "Join Waitlist"
     else:
-        buttons = [[InlineKeyboardButton("Join Waitlist", callback_data=f"rsvp:{event_data['id']}")]]
-    
-    keyboard = InlineKeyboardMarkup(buttons)
-    
-    return text, keyboard
+        label = "RSVP"
+    return cached_render(
+        event_data,
+        f"keyboard:{label}",
+        lambda event: InlineKeyboardMarkup([[InlineKeyboardButton(label, callback_data=f"rsvp:{event['id']}")]])
+    )
 
 async def generate_announcemnt_preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Generate a preview of the announcement."""
@@ -282,17 +430,19 @@ def generate_group_rsvp_button(context: ContextTypes.DEFAULT_TYPE, event_data_ov
     else:
         event_data = context.user_data["working_event"]
     
-    rsvp_text = (
-        f"{rsvp_header_text(event_data)}\n"
+    rsvp_text = cached_render(event_data, "group_button_text", lambda event: (
+        f"{rsvp_header_text(event)}\n"
         f"Press the button below to RSVP\.\n\n"
         f"_*Note: The bot can only message you and accept your RSVP if you have started a conversation with it first\.*_\n"
-    )
-    _, keyboard = generate_announcement_message(context, event_data)
+    ))
     
-    return rsvp_text, keyboard
+    return rsvp_text, announcement_keyboard(event_data)
 
 async def post_announcement(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Post the announcement to the event channel, then wait 5 seconds and send the group RSVP button."""
+    """
+    Post the announcement to the event channel and schedule the group RSVP
+    button to be posted GROUP_BUTTON_DELAY seconds later by the job queue.
+    """
     event_data = context.user_data["working_event"]
 
     # 1. Generate the announcement text & keyboard
@@ -308,26 +458,76 @@ async def post_announcement(update: Update, context: ContextTypes.DEFAULT_TYPE):
             chat_id=chat_ids["announcements"],
             text=text,
             parse_mode=ParseMode.MARKDOWN_V2,
-            reply_markup=keyboard
+            reply_markup=keyboard,
+            rate_limit_args=PRIORITY_ANNOUNCEMENT
+        )
+    except Exception as e:
+        print(f"[ERROR] Failed to post announcement: {e}")
+        await update.effective_chat.send_message(
+            "Failed to post the announcement. Check the bot's permissions."
         )
+        return await show_announcement_menu(update, context)
 
-        # 3. Update event data
-        event_data["announcement_state"] = "Posted"
-        event_data["announcement_message_id"] = sent_message.message_id
-        event_data["announcement_message_chat_id"] = sent_message.chat.id
-        save_working_event(context)
+    # 3. Update event data. The due time of the group button is saved with the
+    # event so the button is still posted if the bot restarts before then.
+    due = datetime.now(timezone.utc) + timedelta(seconds=GROUP_BUTTON_DELAY)
+    event_data["announcement_state"] = "Posted"
+    event_data["announcement_message_id"] = sent_message.message_id
+    event_data["announcement_message_chat_id"] = sent_message.chat.id
+    event_data["group_rsvp_button_due"] = due.isoformat()
+    event_data["group_rsvp_button_admin_chat_id"] = update.effective_chat.id
+    remember_rendered(sent_message.chat.id, sent_message.message_id, text, keyboard)
+    save_working_event(context)
+
+    # 4. Post the group button later without holding up the admin (or anyone else)
+    schedule_group_rsvp_button(context.job_queue, event_data)
+
+    # 5. Notify the admin of success
+    text = f"Announcement posted.\n\nThe RSVP button will be posted in {GROUP_BUTTON_DELAY} seconds..."
+    query = update.callback_query
+    if query:
+        # Edit the admin’s inline menu to say “posted”
+        await query.edit_message_text(text)
+    else:
+        await update.effective_chat.send_message(text)
+
+    return await show_announcement_menu(update, context)
+
+
+def schedule_group_rsvp_button(job_queue, event_data: dict) -> None:
+    """Schedule the job that posts the event's group RSVP button at its saved due time."""
+    due = datetime.fromisoformat(event_data["group_rsvp_button_due"])
+    delay = max(0.0, (due - datetime.now(timezone.utc)).total_seconds())
+    job_queue.run_once(
+        post_group_rsvp_button_job,
+        when=delay,
+        data=event_data["id"],
+        name=f"group_rsvp_button:{event_data['id']}"
+    )
 
-        # 4. Notify the admin of success
-        query = update.callback_query
-        if query:
-            # Edit the admin’s inline menu to say “posted”
-            await query.edit_message_text("Announcement posted.\n\nThe RSVP button will be posted in 5 seconds...")
-        else:
-            await update.effective_chat.send_message("Announcement posted.\n\nThe RSVP button will be posted in 5 seconds...")
 
-        # 5. Wait 5 seconds (this is synchronous - the user is effectively blocked)
-        await asyncio.sleep(5)
+def schedule_pending_group_buttons(application: Application) -> None:
+    """At startup, reschedule group RSVP buttons that were due to be posted when the bot stopped."""
+    for event_data in application.bot_data.get("events", []):
+        if event_data.get("group_rsvp_button_due"):
+            schedule_group_rsvp_button(application.job_queue, event_data)
 
+
+async def post_group_rsvp_button_job(context: ContextTypes.DEFAULT_TYPE):
+    """Job queue callback that posts the group RSVP button for the event in context.job.data."""
+    event_id = context.job.data
+    await run_serially(event_id, post_group_rsvp_button, context, event_id)
+
+
+async def post_group_rsvp_button(context: ContextTypes.DEFAULT_TYPE, event_id: int):
+    """Post the RSVP button to the group chat and let the admin who posted the announcement know."""
+    event_data = get_event(context, event_id)
+    if not event_data or not event_data.get("group_rsvp_button_due"):
+        # The event was closed, or the button was already posted
+        return
+    admin_chat_id = event_data.get("group_rsvp_button_admin_chat_id")
+
+    try:
         # We genegate the RSVP button and post it to the group chat
         rsvp_text, group_keyboard = generate_group_rsvp_button(context, event_data)
 
@@ -335,24 +535,27 @@ async def post_announcement(update: Update, context: ContextTypes.DEFAULT_TYPE):
             chat_id=chat_ids["group"],
             text=rsvp_text,
             parse_mode=ParseMode.MARKDOWN_V2,
-            reply_markup=group_keyboard
+            reply_markup=group_keyboard,
+            rate_limit_args=PRIORITY_ANNOUNCEMENT
         )
-
-        # Optionally store the new button info
-        event_data["group_rsvp_button_message_id"] = sent_button.message_id
-        event_data["group_rsvp_button_chat_id"] = sent_button.chat.id
-        save_working_event(context)
-
-        # 7. Let the admin know the button is posted
-        await update.effective_chat.send_message("RSVP button posted to the group.")
-
     except Exception as e:
-        print(f"[ERROR] Failed to post announcement: {e}")
-        await update.effective_chat.send_message(
-            "Failed to post the announcement or RSVP button. Check the bot's permissions."
-        )
+        print(f"[ERROR] Failed to post group RSVP button: {e}")
+        event_data["group_rsvp_button_due"] = None
+        save_event(context, event_data)
+        if admin_chat_id:
+            await context.bot.send_message(admin_chat_id, "Failed to post the RSVP button to the group. Check the bot's permissions.")
+        return
 
-    return await show_announcement_menu(update, context)
+    # Store the new button info
+    event_data["group_rsvp_button_message_id"] = sent_button.message_id
+    event_data["group_rsvp_button_chat_id"] = sent_button.chat.id
+    event_data["group_rsvp_button_due"] = None
+    remember_rendered(sent_button.chat.id, sent_button.message_id, rsvp_text, group_keyboard)
+    save_event(context, event_data)
+
+    # Let the admin know the button is posted
+    if admin_chat_id:
+        await context.bot.send_message(admin_chat_id, f"RSVP button for {event_data['name']} posted to the group.")
 
 
 async def update_posted_announcement(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -364,14 +567,7 @@ async def update_posted_announcement(update: Update, context: ContextTypes.DEFAU
 
     # 2. Edit the channel announcement
     try:
-        await context.bot.edit_message_text(
-            chat_id=event_data["announcement_message_chat_id"],
-            message_id=event_data["announcement_message_id"],
-            text=text,
-            parse_mode=ParseMode.MARKDOWN_V2,
-            reply_markup=keyboard,
-            disable_web_page_preview=True
-        )
+        await edit_if_changed(context.bot, event_data["announcement_message_chat_id"], event_data["announcement_message_id"], text, keyboard)
 
         query = update.callback_query
         if query:
@@ -398,15 +594,8 @@ async def update_posted_announcement(update: Update, context: ContextTypes.DEFAU
             # Generate the announcement keyboard
             rsvp_text, keyboard = generate_group_rsvp_button(context, event_data)  # your function that returns (text, keyboard)
 
-            await context.bot.edit_message_text(
-                chat_id=event_data["group_rsvp_button_chat_id"],
-                message_id=event_data["group_rsvp_button_message_id"],
-                text=rsvp_text,
-                parse_mode=ParseMode.MARKDOWN_V2,
-                reply_markup=keyboard,
-                disable_web_page_preview=True
-            )
-            print("RSVP button in group chat updated successfully.")
+            if await edit_if_changed(context.bot, event_data["group_rsvp_button_chat_id"], event_data["group_rsvp_button_message_id"], rsvp_text, keyboard):
+                print("RSVP button in group chat updated successfully.")
 
         except Exception as ex:
             print(f"[ERROR] Failed to edit RSVP message in group chat: {ex}")
@@ -442,9 +631,13 @@ async def edit_posted_announcement_text_input(update: Update, context: ContextTy
     announcement_text = update.message.text_markdown_v2 or update.message.text
     announcement_text = announcement_text.strip()
 
+    if len(announcement_text) > announcement_text_limit(context.user_data["working_event"]):
+        await reply_text_too_long(update, context, announcement_text)
+        return ANNOUNCEMENT_EDIT_POSTED_ANNOUNCEMENT_TEXT
+
     context.user_data["working_event"]["announcement_state"] = "Posted"
     context.user_data["working_event"]["announcement_text"] = announcement_text
-    save_working_event(context)
+    save_edited_event(context)
 
     await update.message.reply_text("Announcement text updated.")
     return await show_announcement_menu(update, context)
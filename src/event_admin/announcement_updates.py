@@ -0,0 +1,165 @@
+# event_admin/announcement_updates.py
+
+import asyncio
+import hashlib
+import json
+import time
+from telegram.constants import ParseMode
+from telegram.error import BadRequest
+from config import config
+from event_admin.data_manager import get_event
+from utils import metrics
+from utils.outbound import PRIORITY_ANNOUNCEMENT
+
+# Minimum number of seconds between two edits of an event's announcement and
+# group RSVP button. Changes made in between are collapsed into one edit that
+# shows the latest attendee list.
+ANNOUNCEMENT_EDIT_INTERVAL = getattr(config, "announcement_edit_interval", 3)
+
+# event_id -> {"task": pending refresh task or None, "last_sent": time of the last edit, "lock": asyncio.Lock}
+_refreshes = {}
+
+# (chat_id, message_id) -> fingerprint of the text and keyboard last sent to
+# that posted message, so edits that would not change anything are skipped.
+_rendered = {}
+
+
+def _fingerprint(text: str, keyboard=None) -> str:
+    markup = json.dumps(keyboard.to_dict(), sort_keys=True) if keyboard else ""
+    return hashlib.sha256(f"{text}\0{markup}".encode()).hexdigest()
+
+
+def remember_rendered(chat_id: int, message_id: int, text: str, keyboard=None) -> None:
+    """Record what a newly posted message shows."""
+    _rendered[(chat_id, message_id)] = _fingerprint(text, keyboard)
+
+
+def forget_rendered(chat_id: int, message_id: int) -> None:
+    """Forget a posted message that won't be edited again, e.g. the announcement of a closed event."""
+    _rendered.pop((chat_id, message_id), None)
+
+
+async def edit_if_changed(bot, chat_id: int, message_id: int, text: str, keyboard=None) -> bool:
+    """
+    Edit a posted MarkdownV2 message unless it already shows this text and
+    keyboard. Returns True if an edit was sent. Errors other than Telegram's
+    "message is not modified" are raised to the caller.
+    """
+    metrics.increment("message_edits_requested")
+    key = (chat_id, message_id)
+    fingerprint = _fingerprint(text, keyboard)
+    if _rendered.get(key) == fingerprint:
+        metrics.increment("message_edits_skipped")
+        return False
+
+    try:
+        await bot.edit_message_text(
+            chat_id=chat_id,
+            message_id=message_id,
+            text=text,
+            parse_mode=ParseMode.MARKDOWN_V2,
+            reply_markup=keyboard,
+            disable_web_page_preview=True,
+            rate_limit_args=PRIORITY_ANNOUNCEMENT
+        )
+    except BadRequest as ex:
+        # The message already showed this (e.g. the bot restarted since the last edit)
+        if "message is not modified" not in str(ex).lower():
+            raise
+        metrics.increment("message_edits_not_modified")
+    _rendered[key] = fingerprint
+    return True
+
+
+def edit_skip_rate() -> float:
+    """Fraction of posted message edits skipped because nothing visible changed."""
+    return metrics.ratio("message_edits_skipped", "message_edits_requested")
+
+
+def _get_refresh(event_id: int) -> dict:
+    refresh = _refreshes.get(event_id)
+    if refresh is None:
+        refresh = _refreshes[event_id] = {"task": None, "last_sent": 0.0, "lock": asyncio.Lock()}
+    return refresh
+
+
+def schedule_announcement_update(context, event_id: int) -> None:
+    """
+    Ask for the event's posted announcement and group RSVP button to be
+    re-rendered. The first request after a quiet period is sent right away;
+    requests within ANNOUNCEMENT_EDIT_INTERVAL of the last edit share one edit.
+    """
+    metrics.increment("announcement_edits_requested")
+    refresh = _get_refresh(event_id)
+    if refresh["task"] is not None and not refresh["task"].done():
+        metrics.increment("announcement_edits_coalesced")
+        return
+    delay = max(0.0, refresh["last_sent"] + ANNOUNCEMENT_EDIT_INTERVAL - time.monotonic())
+    refresh["task"] = context.application.create_task(_refresh_after(context, event_id, delay))
+
+
+async def _refresh_after(context, event_id: int, delay: float):
+    if delay:
+        await asyncio.sleep(delay)
+    refresh = _get_refresh(event_id)
+    async with refresh["lock"]:
+        # Requests made from here on need a new edit, as this one may have
+        # already rendered the event.
+        refresh["task"] = None
+        refresh["last_sent"] = time.monotonic()
+        metrics.increment("announcement_edits_sent")
+        await send_announcement_update(context, event_id)
+
+
+async def discard_announcement_update(event_id: int) -> None:
+    """Cancel a pending refresh and wait for one that is being sent, e.g. before closing the event."""
+    refresh = _refreshes.pop(event_id, None)
+    if refresh is None:
+        return
+    if refresh["task"] is not None:
+        refresh["task"].cancel()
+    async with refresh["lock"]:
+        pass
+
+
+async def send_announcement_update(context, event_id: int):
+    """
+    Re-generate the announcement text & keyboard from the event's current state,
+    then edit both:
+      1. The channel's announcement message (announcement_message_id).
+      2. The group's RSVP button message (group_rsvp_button_message_id),
+         if it exists in event_data.
+    """
+    from event_admin.announcement import generate_announcement_message, generate_group_rsvp_button, warn_admin_about_length
+
+    event_data = get_event(context, event_id)
+    if not event_data or not event_data.get("show", True):
+        # Closed events have their announcement edited by close.py
+        return
+
+    # 1. Generate new text & keyboard based on the updated event data
+    new_text, new_keyboard = generate_announcement_message(context, event_data_override=event_data)
+    await warn_admin_about_length(context, event_data)
+
+    # 2. First, update the announcement in the channel
+    try:
+        if await edit_if_changed(context.bot, event_data["announcement_message_chat_id"], event_data["announcement_message_id"], new_text, new_keyboard):
+            metrics.increment("announcement_messages_edited")
+            print("[DEBUG] Channel announcement updated successfully.")
+    except Exception as ex:
+        print(f"[ERROR] Could not update channel announcement: {ex}")
+
+    # 3. Now, update the RSVP button in the group, if we have a stored message ID
+    group_chat_id = event_data.get("group_rsvp_button_chat_id")
+    group_msg_id  = event_data.get("group_rsvp_button_message_id")
+
+    if group_chat_id and group_msg_id:
+        try:
+            new_text, new_keyboard = generate_group_rsvp_button(context, event_data)
+            if await edit_if_changed(context.bot, group_chat_id, group_msg_id, new_text, new_keyboard):
+                metrics.increment("announcement_messages_edited")
+                print("[DEBUG] Group RSVP button updated successfully.")
+        except Exception as ex:
+            print(f"[ERROR] Could not update group RSVP button: {ex}")
+    else:
+        print("[DEBUG] No group RSVP message to update.")
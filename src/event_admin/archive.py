@@ -0,0 +1,94 @@
+# event_admin/archive.py
+
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+
+from event_admin import menu
+from event_admin.data_manager import load_archived_events, restore_event
+from event_admin.constants import ARCHIVED_EVENTS, MAIN_MENU
+
+# Callback data constants
+BACK_TO_MAIN_MENU = "back_to_main_menu"
+BACK_TO_ARCHIVED_EVENTS = "back_to_archived_events"
+
+
+async def show_archived_events(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    List the closed events. The archive is only read from disk here, when an
+    admin asks for it, and is kept in user_data while they browse it.
+    """
+    query = update.callback_query
+    archived = await load_archived_events()
+    context.user_data["archived_events"] = {event["id"]: event for event in archived}
+
+    if not archived:
+        text = "There are no archived events."
+    else:
+        text = "Here are the closed events. Select one to see it or restore it:"
+
+    # Newest events first
+    buttons = [
+        [InlineKeyboardButton(event["name"], callback_data=f"archived_event_{event['id']}")]
+        for event in reversed(archived)
+    ]
+    buttons.append([InlineKeyboardButton("Main Menu", callback_data=BACK_TO_MAIN_MENU)])
+    keyboard = InlineKeyboardMarkup(buttons)
+
+    await query.edit_message_text(text, reply_markup=keyboard)
+    return ARCHIVED_EVENTS
+
+
+async def show_archived_event(update: Update, context: ContextTypes.DEFAULT_TYPE, event_id: int):
+    """Show the details of one archived event with a button to restore it."""
+    query = update.callback_query
+    event_data = context.user_data.get("archived_events", {}).get(event_id)
+    if not event_data:
+        await query.edit_message_text("Archived event not found.")
+        return await menu.show_main_menu(update, context, False)
+
+    text = menu.generate_event_headers(event_data)
+    text += (
+        "\nRestoring the event puts it back in the events menu. "
+        "Use 'Update Posted Announcement' afterwards to bring back the RSVP button."
+    )
+    buttons = [
+        [InlineKeyboardButton("Restore Event", callback_data=f"restore_event_{event_id}")],
+        [InlineKeyboardButton("<< Back", callback_data=BACK_TO_ARCHIVED_EVENTS), InlineKeyboardButton("Main Menu", callback_data=BACK_TO_MAIN_MENU)]
+    ]
+    keyboard = InlineKeyboardMarkup(buttons)
+
+    await query.edit_message_text(text, reply_markup=keyboard)
+    return ARCHIVED_EVENTS
+
+
+async def archived_events_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle callbacks from the archived events menus."""
+    query = update.callback_query
+    data = query.data
+    await query.answer()
+
+    if data.startswith("archived_event_"):
+        return await show_archived_event(update, context, int(data.split("_")[-1]))
+
+    elif data.startswith("restore_event_"):
+        event_id = int(data.split("_")[-1])
+        event_data = await restore_event(context, event_id)
+        context.user_data.pop("archived_events", None)
+        if not event_data:
+            await query.edit_message_text("Archived event not found.")
+            return await menu.show_main_menu(update, context, False)
+
+        # Continue in the restored event's menu
+        context.user_data["working_event"] = event_data
+        await update.effective_chat.send_message(f"Event {event_data['name']} has been restored.")
+        return await menu.show_event_menu(update, context)
+
+    elif data == BACK_TO_ARCHIVED_EVENTS:
+        return await show_archived_events(update, context)
+
+    elif data == BACK_TO_MAIN_MENU:
+        context.user_data.pop("archived_events", None)
+        return await menu.show_main_menu(update, context)
+
+    await query.edit_message_text("Unknown action.")
+    return MAIN_MENU
@@ -0,0 +1,141 @@
+# event_admin/broadcast.py
+
+import asyncio
+import time
+from telegram.constants import ParseMode
+from telegram.error import NetworkError
+from config import config
+from utils import metrics
+from utils.outbound import PRIORITY_BULK
+from utils.unreachable import is_unreachable, note_send_error
+
+# Number of DMs of one broadcast that are in flight at the same time. The
+# outbound rate limiter still spaces them out under Telegram's limits.
+BROADCAST_CONCURRENCY = getattr(config, "broadcast_concurrency", 8)
+
+# Attempts per recipient for errors that may go away (timeouts, network).
+# Flood control (RetryAfter) is retried by the outbound rate limiter.
+BROADCAST_ATTEMPTS = 3
+
+# Seconds between edits of the admin's progress message.
+PROGRESS_INTERVAL = 3
+
+
+class UnreachableUser(Exception):
+    """A user was skipped because messaging them failed recently."""
+
+
+async def for_each_bounded(items: list, func, limit: int):
+    """Await `func(item)` for every item, with at most `limit` running at once, in order of the list."""
+    pending = list(reversed(items))
+
+    async def worker():
+        while pending:
+            await func(pending.pop())
+
+    await asyncio.gather(*(worker() for _ in range(min(limit, len(items)))))
+
+
+def build_audience(event_data: dict, whom: str) -> list:
+    """
+    Returns the entries to message for "attendees", "waitlist" or "both".
+    "both" is attendees followed by the waitlist, with each user only once.
+    """
+    if whom == "both":
+        list_names = ("attendees", "waitlist")
+    else:
+        list_names = (whom,)
+
+    audience = []
+    seen = set()
+    for list_name in list_names:
+        for entry in event_data.get(list_name, []):
+            if entry["user_id"] not in seen:
+                seen.add(entry["user_id"])
+                audience.append(entry)
+    return audience
+
+
+async def _send_one(bot, entry: dict, text: str):
+    """Send the message to one user. Returns None on success or the error that stopped it."""
+    if is_unreachable(entry["user_id"]):
+        metrics.increment("broadcast_skipped_unreachable")
+        return UnreachableUser("recent messages to this user failed")
+    for attempt in range(BROADCAST_ATTEMPTS):
+        try:
+            await bot.send_message(
+                chat_id=entry["user_id"],
+                text=text,
+                parse_mode=ParseMode.MARKDOWN_V2,
+                rate_limit_args=PRIORITY_BULK
+            )
+            return None
+        except NetworkError as ex:
+            # NetworkError includes TimedOut. RetryAfter was already retried by
+            # the rate limiter; Forbidden and BadRequest won't change on a retry.
+            if attempt == BROADCAST_ATTEMPTS - 1:
+                return ex
+            metrics.increment("broadcast_retries")
+            await asyncio.sleep(2 ** attempt)
+        except Exception as ex:
+            note_send_error(entry["user_id"], ex)
+            return ex
+
+
+def _progress_text(label: str, progress: dict, total: int, done: bool) -> str:
+    if done:
+        text = f"Message sent to {progress['sent']}/{total} {label}.\n"
+        if progress["failed"]:
+            text += "Unable to send to:\n" + ", ".join(progress["failed"])
+        return text
+    finished = progress["sent"] + len(progress["failed"])
+    return f"Sending message to {label}: {finished}/{total} done ({progress['sent']} sent, {len(progress['failed'])} failed)..."
+
+
+async def run_broadcast(bot, audience: list, text: str, label: str, status_message):
+    """
+    Send `text` to every entry in `audience` with at most BROADCAST_CONCURRENCY
+    sends in flight, editing `status_message` with the progress as it goes.
+    """
+    started = time.perf_counter()
+    progress = {"sent": 0, "failed": []}
+
+    async def send(entry: dict):
+        error = await _send_one(bot, entry, text)
+        if error is None:
+            progress["sent"] += 1
+        else:
+            print(f"[ERROR] Could not send DM to {entry['user_id']}: {error}")
+            progress["failed"].append(entry.get("username") or "UnknownUser")
+
+    async def report_progress():
+        last_text = None
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            status_text = _progress_text(label, progress, len(audience), False)
+            if status_text != last_text:
+                try:
+                    await status_message.edit_text(status_text)
+                    last_text = status_text
+                except Exception as ex:
+                    print(f"[Broadcast] Could not update progress message: {ex}")
+
+    reporter = asyncio.create_task(report_progress())
+    try:
+        await for_each_bounded(audience, send, BROADCAST_CONCURRENCY)
+    finally:
+        reporter.cancel()
+
+    metrics.increment("broadcast_sent", progress["sent"])
+    metrics.increment("broadcast_failed", len(progress["failed"]))
+    metrics.observe("broadcast_duration", time.perf_counter() - started)
+    try:
+        await status_message.edit_text(_progress_text(label, progress, len(audience), True))
+    except Exception as ex:
+        print(f"[Broadcast] Could not send broadcast summary: {ex}")
+    return progress
+
+
+def start_broadcast(context, audience: list, text: str, label: str, status_message):
+    """Run the broadcast as a background task so the admin can keep using the menu."""
+    return context.application.create_task(run_broadcast(context.bot, list(audience), text, label, status_message))
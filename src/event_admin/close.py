@@ -4,14 +4,23 @@ sys.path.append("..")
 import asyncio
 import re
 from datetime import date, time, datetime
+from time import perf_counter
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup
 )
 from telegram.ext import ContextTypes, ConversationHandler, CallbackQueryHandler, MessageHandler, filters
 from telegram.constants import ParseMode
 from telegram.helpers import escape_markdown
-from event_admin.data_manager import save_events, save_working_event
+from telegram.error import BadRequest
+from event_admin.data_manager import save_working_event, wait_until_saved, archive_event
+from event_admin.broadcast import BROADCAST_CONCURRENCY, for_each_bounded
 from event_admin import menu, edit_event
+from event_admin.actors import run_serially
+from event_admin.members import forget_event_index
+from event_admin.render_cache import forget_event_renders
+from event_admin.announcement_updates import discard_announcement_update, edit_if_changed, forget_rendered
+from utils.outbound import PRIORITY_ANNOUNCEMENT, PRIORITY_BULK
+from utils.unreachable import is_unreachable, note_send_error
 from event_admin.constants import (
     MAIN_MENU,
     NEW_EVENT_NAME,
@@ -32,6 +41,10 @@ from event_admin.constants import (
 )
 from config.config import chat_ids
 from rsvp import rsvp_header_text
+from utils import metrics
+
+# event_id -> background task that is removing the buttons of a closed event
+_closing = {}
 
 
 async def ask_to_close_event(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -42,7 +55,7 @@ async def ask_to_close_event(update: Update, context: ContextTypes.DEFAULT_TYPE)
     text = (
         f"{menu.generate_event_headers(context.user_data['working_event'])}\n"
         "Closing the event will have the following effects:\n"
-        "- The event will no longer show up in the event menu, but the data will still be saved.\n"
+        "- The event will be moved to the archive. It can be restored from Archived Events in the main menu.\n"
         "- The announcement will be edited to not have a button to RSVP.\n"
         "- The button in the group chat will be deleted.\n"
         "- The rsvp confirmation messages will no longer have a button to cancel the RSVP.\n\n"
@@ -65,7 +78,9 @@ async def ask_to_close_event_callback(update: Update, context: ContextTypes.DEFA
     query = update.callback_query
     query.answer()
     if query.data == "yes_close_event":
-        return await close_event(update, context)
+        # Closing edits every RSVP, so it waits for RSVPs already queued for the event
+        event_id = context.user_data["working_event"]["id"]
+        return await run_serially(event_id, close_event, update, context)
     elif query.data == "no_close_event":
         return await menu.show_event_menu(update, context)
     else:
@@ -74,64 +89,119 @@ async def ask_to_close_event_callback(update: Update, context: ContextTypes.DEFA
     
 async def close_event(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Close the working event and save it to the bot_data.
+    Close the working event: archive it (the only save), then clean up the
+    posted messages in a background task and report a summary to the admin.
     """
     # Get the working event from user_data
     event_data = context.user_data.get("working_event")
     if not event_data:
         await update.message.reply_text("No working event found.")
         return ConversationHandler.END
+    if event_data["id"] in _closing:
+        await update.effective_chat.send_message(f"Event {event_data['name']} is already being closed.")
+        return await menu.show_main_menu(update, context, False)
     
     # 1. The event will no longer show up in the event menu.
-    # The data will still be saved in the bot_data and I can recover it if needed.
+    # It is moved to the archive, where it can be restored from the Archived Events menu.
+    # Make sure it is on disk before telling the admin.
     event_data["show"] = False
-    save_working_event(context)
+    # A group RSVP button that has not been posted yet is no longer needed.
+    event_data["group_rsvp_button_due"] = None
+    await wait_until_saved(archive_event(context, event_data))
     
-    # 2. The annoucement that was posted in the channel will be edited to not have a button to RSVP
-    await close_announcement_message(update, context, event_data)
+    # Pending RSVP re-renders would put the RSVP button back, so drop them first.
+    await discard_announcement_update(event_data["id"])
     
-    # 3. The button that was posted in the group chat will be deleted
-    try:
-        await context.bot.delete_message(chat_id=event_data["group_rsvp_button_chat_id"], message_id=event_data["group_rsvp_button_message_id"])
-    except Exception as ex:
-            print(f"[Close] Could not delete RSVP button from group chat: {ex}")
-        
-    # 4. The rsvp confirmation messages will no longer have a button to cancel the RSVP
-    for attendee in event_data["attendees"]:
-        rsvp_message_id = attendee.get("rsvp_message_id")
-        if rsvp_message_id:
-            try:
-                await context.bot.edit_message_reply_markup(
-                    chat_id=attendee["user_id"],
-                    message_id=rsvp_message_id,
-                    reply_markup=None,
-                    disable_web_page_preview=True
-                )
-            except Exception as ex:
-                print(f"[RSVP] Could not remove RSVP button: {ex}")
-    for attendee in event_data["waitlist"]:
-        rsvp_message_id = attendee.get("rsvp_message_id")
-        if rsvp_message_id:
-            try:
-                await context.bot.edit_message_reply_markup(
-                    chat_id=attendee["user_id"],
-                    message_id=rsvp_message_id,
-                    reply_markup=None,
-                    disable_web_page_preview=True
-                )
-            except Exception as ex:
-                print(f"[RSVP] Could not remove RSVP button: {ex}")
+    status_message = await update.effective_chat.send_message(
+        f"Event {event_data['name']} is now closed. Removing the RSVP buttons..."
+    )
+    task = context.application.create_task(close_posted_messages(context, event_data, status_message))
+    _closing[event_data["id"]] = task
+    task.add_done_callback(lambda _: _closing.pop(event_data["id"], None))
+
+    # Return to the main menu
+    return await menu.show_main_menu(update, context, False)
+
+async def close_posted_messages(context: ContextTypes.DEFAULT_TYPE, event_data: dict, status_message):
+    """
+    Runs in the background after an event is closed. At the same time:
+    2. The announcement that was posted in the channel is edited to not have a button to RSVP.
+    3. The button that was posted in the group chat is deleted.
+    4. The rsvp confirmation messages no longer have a button to cancel the RSVP.
+    """
+    started = perf_counter()
+    summary = {"edited": 0, "already_deleted": 0, "unreachable": 0, "failed": 0}
     
-    save_working_event(context)
+    async def remove_cancel_button(entry: dict):
+        if is_unreachable(entry["user_id"]):
+            summary["unreachable"] += 1
+            return
+        try:
+            await context.bot.edit_message_reply_markup(
+                chat_id=entry["user_id"],
+                message_id=entry["rsvp_message_id"],
+                reply_markup=None,
+                rate_limit_args=PRIORITY_BULK
+            )
+            summary["edited"] += 1
+        except BadRequest as ex:
+            reason = str(ex).lower()
+            if "not modified" in reason:
+                summary["edited"] += 1
+            elif "not found" in reason or "can't be edited" in reason:
+                summary["already_deleted"] += 1
+            else:
+                print(f"[Close] Could not remove RSVP button: {ex}")
+                summary["failed"] += 1
+        except Exception as ex:
+            if note_send_error(entry["user_id"], ex):
+                summary["unreachable"] += 1
+                return
+            print(f"[Close] Could not remove RSVP button: {ex}")
+            summary["failed"] += 1
     
-    # Notify the user
-    await update.effective_chat.send_message(
-        f"Event {event_data['name']} is now closed."
+    entries = [
+        entry for list_name in ("attendees", "waitlist")
+        for entry in event_data.get(list_name, [])
+        if entry.get("rsvp_message_id")
+    ]
+    await asyncio.gather(
+        close_announcement_message(None, context, event_data),
+        delete_group_rsvp_button(context, event_data),
+        for_each_bounded(entries, remove_cancel_button, BROADCAST_CONCURRENCY),
     )
+    metrics.observe("close_event_duration", perf_counter() - started)
+    forget_closed_event(event_data)
     
+    text = (
+        f"Event {event_data['name']} is now closed.\n"
+        f"Cancel buttons removed: {summary['edited']}\n"
+        f"Messages already deleted: {summary['already_deleted']}\n"
+        f"Users the bot can't message: {summary['unreachable']}\n"
+        f"Failed: {summary['failed']}"
+    )
+    try:
+        await status_message.edit_text(text)
+    except Exception as ex:
+        print(f"[Close] Could not send close summary: {ex}")
+    return summary
 
-    # Return to the main menu
-    return await menu.show_main_menu(update, context, False)
+def forget_closed_event(event_data: dict):
+    """Drop everything kept in memory for the closed event, including what closing it rendered."""
+    from event_admin.announcement import forget_announcement_lengths
+
+    forget_event_index(event_data["id"])
+    forget_event_renders(event_data["id"])
+    forget_announcement_lengths(event_data["id"])
+    forget_rendered(event_data.get("announcement_message_chat_id"), event_data.get("announcement_message_id"))
+    forget_rendered(event_data.get("group_rsvp_button_chat_id"), event_data.get("group_rsvp_button_message_id"))
+
+async def delete_group_rsvp_button(context: ContextTypes.DEFAULT_TYPE, event_data: dict):
+    """Delete the RSVP button that was posted in the group chat."""
+    try:
+        await context.bot.delete_message(chat_id=event_data["group_rsvp_button_chat_id"], message_id=event_data["group_rsvp_button_message_id"], rate_limit_args=PRIORITY_ANNOUNCEMENT)
+    except Exception as ex:
+        print(f"[Close] Could not delete RSVP button from group chat: {ex}")
 
 async def close_announcement_message(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict):
     """
@@ -143,12 +213,6 @@ async def close_announcement_message(update: Update, context: ContextTypes.DEFAU
 
     try:
         text, _ = generate_announcement_message(context, event_data_override=event_data)
-        await context.bot.edit_message_text(
-            chat_id=event_data["announcement_message_chat_id"],
-            message_id=event_data["announcement_message_id"],
-            text=text,
-            parse_mode=ParseMode.MARKDOWN_V2,
-            disable_web_page_preview=True
-        )
+        await edit_if_changed(context.bot, event_data["announcement_message_chat_id"], event_data["announcement_message_id"], text)
     except Exception as ex:
         print(f"[RSVP] Could not remove RSVP button: {ex}")
\ No newline at end of file
@@ -21,8 +21,10 @@
     RSVP_MENU,
     MESSAGE_RSVP_INPUT,
     MESSAGE_RSVP_WHOM,
-    ASK_CLOSE_EVENT
-) = range(20)
+    ASK_CLOSE_EVENT,
+    ARCHIVED_EVENTS,
+    VIEW_ATTENDEES
+) = range(22)
 
 # Callback data constants
 CANCEL_NEW_EVENT        = "cancel_new_event"
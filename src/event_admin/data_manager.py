@@ -1,7 +1,35 @@
 import os
-import json
+import time
+import asyncio
+import functools
+from config import config
+from event_admin.storage import JsonStorage, SqliteStorage, BackgroundWriter, MEMBER_LISTS
+from event_admin.render_cache import bump_version, forget_event_renders
+from event_admin.members import forget_event_index
 from config.config import event_admins
+from utils import metrics
 
+# How often (in seconds) pending changes to bot_data are written to disk.
+# Changes made between two flushes are coalesced into a single write.
+SAVE_INTERVAL = getattr(config, "save_interval", 5)
+
+# "json" keeps everything in data/bot_data.json, "sqlite" uses data/bot_data.sqlite3.
+STORAGE_BACKEND = getattr(config, "storage_backend", "json")
+
+# The JSON backend appends each change to data/bot_data.journal and compacts the
+# journal into a new bot_data.json after this many seconds or records.
+COMPACT_INTERVAL = getattr(config, "compact_interval", 300)
+COMPACT_RECORDS = getattr(config, "compact_records", 1000)
+
+# Number of previous bot_data.json snapshots kept as bot_data.json.1, .2, ...
+SNAPSHOT_BACKUPS = getattr(config, "snapshot_backups", 3)
+
+_storage = None
+_writer = None
+
+# Index of bot_data["events"] by event ID. It is rebuilt whenever the list is
+# replaced or changes length, so lookups never need to scan the list.
+_event_index = {"events": None, "size": 0, "by_id": {}, "positions": {}}
 
 
 def find_project_root(target_folder="telegram_event_bot"):
@@ -18,92 +46,255 @@ def find_project_root(target_folder="telegram_event_bot"):
 def is_event_admin(user_id: int) -> bool:
     return user_id in event_admins
 
-def save_events(context) -> None:
-    """
-    Writes context.bot_data (which should contain {"events": [...]} )
-    to the data/events.json file.
-    """
+def get_data_file() -> str:
+    """Returns the path of data/bot_data.json in the project root."""
     # Get the root directory of the project
     project_root = find_project_root()
 
     # Define the data directory and file paths relative to the project root
     data_dir = os.path.join(project_root, "data")
-    data_file = os.path.join(data_dir, "bot_data.json")
+    return os.path.join(data_dir, "bot_data.json")
 
-    # Prepare the data to write
-    data = {
-        "events": context.bot_data.get("events", [])
-    }
+def get_storage():
+    """Returns the storage backend selected by config.storage_backend."""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "sqlite":
+            db_file = os.path.join(os.path.dirname(get_data_file()), "bot_data.sqlite3")
+            _storage = SqliteStorage(db_file)
+        else:
+            _storage = JsonStorage(get_data_file(), COMPACT_INTERVAL, COMPACT_RECORDS, SNAPSHOT_BACKUPS)
+    return _storage
 
-    # Write JSON
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+def get_writer() -> BackgroundWriter:
+    """Returns the thread that performs every storage write."""
+    global _writer
+    if _writer is None:
+        _writer = BackgroundWriter()
+    return _writer
 
-def save_working_event(context) -> None:
+def _records_loop_stall(func):
+    """Records how long a persistence call kept the event loop busy."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.observe("persist_loop_stall", time.perf_counter() - started)
+    return wrapper
+
+def snapshot_event(event: dict) -> dict:
     """
-    Writes context.bot_data (which should contain {"events": [...]} )
-    to the data/events.json file.
+    Copies an event deeply enough that the writer thread can serialize it
+    while handlers keep changing the original.
     """
-    # Get the root directory of the project
-    project_root = find_project_root()
+    copy = dict(event)
+    for list_name in MEMBER_LISTS:
+        copy[list_name] = [dict(entry) for entry in event.get(list_name, [])]
+    return copy
 
-    # Define the data directory and file paths relative to the project root
-    data_dir = os.path.join(project_root, "data")
-    data_file = os.path.join(data_dir, "bot_data.json")
+def load_startup_events() -> list:
+    """
+    Returns the events to keep in bot_data. The SQLite backend only loads
+    active (show == True) events; the JSON backend loads the last snapshot
+    and replays the journal written after it.
+    """
+    return get_storage().load_events()
 
-    # Update the event in bot_data, save, etc.
-    for index, stored_event in enumerate(context.bot_data["events"]):
-        if stored_event["id"] == context.user_data["working_event"]["id"]:
-            # Replace the entire dictionary with user_data["working_event"]
-            context.bot_data["events"][index] = context.user_data["working_event"]
-            break
+def next_event_id(context) -> int:
+    """Returns an unused event ID, including IDs of closed events that are not loaded."""
+    events = context.bot_data.get("events", [])
+    highest = max([e["id"] for e in events], default=0)
+    return max(highest, get_storage().max_event_id()) + 1
 
-    # Write JSON
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(context.bot_data, f, ensure_ascii=False, indent=4)
+async def wait_until_saved(future) -> None:
+    """Waits until a save returned by one of the save_* functions is on disk."""
+    await asyncio.wrap_future(future)
 
+def _compact(storage, events: list) -> None:
+    storage.compact(events)
+    metrics.increment("persist_flushes")
 
-def load_events(context) -> None:
+@_records_loop_stall
+def flush(bot_data, force: bool = False):
     """
-    Reloads the events from the data/events.json file into context.bot_data *in place*.
-    This avoids the 'AttributeError: You cannot assign a new value to bot_data'.
+    Makes pending changes to bot_data (which should contain {"events": [...]} )
+    durable, and writes a new snapshot when one is due. Returns a future that
+    completes when the writer thread has done so.
     """
-    # Get the root directory of the project
-    project_root = find_project_root()
+    storage = get_storage()
+    if not storage.compaction_due(force):
+        return get_writer().submit(storage.sync)
 
-    # Define the data directory and file paths relative to the project root
-    data_dir = os.path.join(project_root, "data")
-    data_file = os.path.join(data_dir, "evenbot_datats.json")
+    events = [snapshot_event(event) for event in bot_data.get("events", [])]
+    return get_writer().submit(_compact, storage, events)
+
+async def flush_job(context) -> None:
+    """JobQueue callback that flushes pending changes every SAVE_INTERVAL seconds."""
+    flush(context.bot_data)
 
-    with open(data_file, "r", encoding="utf-8") as f:
-        file_data = json.load(f)  # e.g. {"events": [...]}
+def start_flush_job(application) -> None:
+    """Schedules the periodic flush of bot_data on the application's JobQueue."""
+    application.job_queue.run_repeating(flush_job, interval=SAVE_INTERVAL, first=SAVE_INTERVAL, name="flush_bot_data")
 
-    # Instead of reassigning context.bot_data, update it in place:
-    if "events" in file_data:
-        context.bot_data["events"] = file_data["events"]
-    else:
-        # If "events" key is missing, set it to an empty list or handle as needed
-        context.bot_data["events"] = []
-        
-        
-def update_event_attendees(event_id: int, updated_event_data: dict, context) -> None:
+async def flush_on_shutdown(application) -> None:
+    """post_shutdown hook: writes any changes that are still pending and stops the writer thread."""
+    await wait_until_saved(flush(application.bot_data, force=True))
+    get_writer().submit(get_storage().close)
+    get_writer().stop()
+
+def persistence_stats() -> str:
+    """Returns a short summary of how many saves were requested and written."""
+    return (
+        f"Storage: {STORAGE_BACKEND}\n"
+        f"Save requests: {metrics.get('persist_requests')}\n"
+        f"Disk writes: {metrics.get('persist_flushes')}\n"
+        f"Requests per write: {metrics.ratio('persist_requests', 'persist_flushes'):.1f}\n"
+        f"Waiting in writer queue: {get_writer().calls.qsize()}"
+    )
+
+@_records_loop_stall
+def save_events(context):
     """
-    Replaces the event with ID == event_id in context.bot_data["events"]
-    with updated_event_data, then saves bot_data to disk.
+    Saves every event in context.bot_data["events"] on the writer thread.
     """
-    # Get the root directory of the project
-    project_root = find_project_root()
+    metrics.increment("persist_requests")
+    events = [snapshot_event(event) for event in context.bot_data.get("events", [])]
+    return get_writer().submit(get_storage().save_all, events)
 
-    # Define the data directory and file paths relative to the project root
-    data_dir = os.path.join(project_root, "data")
-    data_file = os.path.join(data_dir, "bot_data.json")
+def index_events(events: list) -> None:
+    """Rebuilds the event ID index for the given bot_data["events"] list."""
+    _event_index["events"] = events
+    _event_index["size"] = len(events)
+    _event_index["by_id"] = {event["id"]: event for event in events}
+    _event_index["positions"] = {event["id"]: idx for idx, event in enumerate(events)}
 
-    # Update the in-memory events list
-    for idx, ev in enumerate(context.bot_data.get("events", [])):
-        if ev["id"] == event_id:
-            context.bot_data["events"][idx] = updated_event_data
-            break
+def _current_index(context) -> dict:
+    events = context.bot_data.setdefault("events", [])
+    if _event_index["events"] is not events or _event_index["size"] != len(events):
+        index_events(events)
+    return _event_index
 
-    # Write the new data to disk
-    with open(data_file, "w", encoding="utf-8") as f:
-        json.dump(context.bot_data, f, ensure_ascii=False, indent=4)
\ No newline at end of file
+def get_event(context, event_id: int):
+    """Returns the event with ID == event_id from context.bot_data, or None."""
+    return _current_index(context)["by_id"].get(event_id)
+
+def add_event(context, event: dict) -> None:
+    """Appends a new event to context.bot_data["events"] and indexes it."""
+    index = _current_index(context)
+    events = index["events"]
+    events.append(event)
+    index["size"] = len(events)
+    index["by_id"][event["id"]] = event
+    index["positions"][event["id"]] = len(events) - 1
+
+def remove_event(context, event_id: int):
+    """Removes the event from context.bot_data["events"]. Returns it, or None."""
+    index = _current_index(context)
+    position = index["positions"].get(event_id)
+    if position is None:
+        return None
+    event = index["events"].pop(position)
+    index_events(index["events"])
+    return event
+
+def replace_event(context, event: dict) -> None:
+    """Replaces the stored event that has the same ID as `event`, keeping its place in the list."""
+    index = _current_index(context)
+    position = index["positions"].get(event["id"])
+    if position is None:
+        return
+    index["events"][position] = event
+    index["by_id"][event["id"]] = event
+
+@_records_loop_stall
+def save_working_event(context):
+    """
+    Copies user_data["working_event"] into context.bot_data["events"] and
+    saves that one event on the writer thread.
+    """
+    # Update the event in bot_data, save, etc.
+    replace_event(context, context.user_data["working_event"])
+
+    metrics.increment("persist_requests")
+    return get_writer().submit(get_storage().save_event, snapshot_event(context.user_data["working_event"]))
+
+def save_edited_event(context):
+    """
+    Like save_working_event, for edits of the event's details (name, date,
+    times, location, capacity, announcement text). Bumps the event's version
+    so text rendered from the old details is not reused.
+    """
+    bump_version(context.user_data["working_event"])
+    return save_working_event(context)
+
+@_records_loop_stall
+def save_event(context, event: dict):
+    """Saves one event from context.bot_data["events"], for code that has no working event (e.g. jobs)."""
+    metrics.increment("persist_requests")
+    return get_writer().submit(get_storage().save_event, snapshot_event(event))
+
+@_records_loop_stall
+def save_rsvp_added(context, event_id: int, list_name: str, entry: dict):
+    """Saves a user that was appended to an event's "attendees" or "waitlist" list."""
+    metrics.increment("persist_requests")
+    return get_writer().submit(get_storage().add_member, event_id, list_name, dict(entry))
+
+@_records_loop_stall
+def save_rsvp_removed(context, event_id: int, list_name: str, user_id: int):
+    """Saves the removal of a user from an event's "attendees" or "waitlist" list."""
+    metrics.increment("persist_requests")
+    return get_writer().submit(get_storage().remove_member, event_id, list_name, user_id)
+
+@_records_loop_stall
+def save_rsvp_promoted(context, event_id: int, entry: dict):
+    """Saves a user that was moved from the waitlist to the end of the attendees list."""
+    metrics.increment("persist_requests")
+    return get_writer().submit(get_storage().promote_member, event_id, dict(entry))
+
+@_records_loop_stall
+def save_rsvp_updated(context, event_id: int, list_name: str, entry: dict):
+    """Saves a change to a user's entry, such as a new rsvp_message_id."""
+    metrics.increment("persist_requests")
+    return get_writer().submit(get_storage().update_member, event_id, list_name, dict(entry))
+
+
+@_records_loop_stall
+def archive_event(context, event: dict):
+    """
+    Moves a closed event out of context.bot_data["events"] and into the
+    archive, so it is no longer loaded, scanned or rewritten with the active events.
+    """
+    remove_event(context, event["id"])
+    # Nothing of the event is kept in memory once it is archived
+    forget_event_index(event["id"])
+    forget_event_renders(event["id"])
+    metrics.increment("persist_requests")
+    return get_writer().submit(get_storage().archive_event, snapshot_event(event))
+
+async def load_archived_events() -> list:
+    """Reads the archived events. They are loaded only when an admin asks for them."""
+    return await asyncio.wrap_future(get_writer().submit(get_storage().load_archived_events))
+
+async def restore_event(context, event_id: int):
+    """Moves an archived event back into context.bot_data["events"]. Returns it, or None."""
+    event = await asyncio.wrap_future(get_writer().submit(get_storage().restore_event, event_id))
+    if event is not None and get_event(context, event_id) is None:
+        add_event(context, event)
+    return event
+
+def archive_closed_events() -> int:
+    """
+    One-time migration: moves every closed event that is still stored with the
+    active events into the archive. Returns the number of events moved.
+    """
+    storage = get_storage()
+    events = storage.load_events()
+    closed = [event for event in events if not event.get("show", True)]
+    for event in closed:
+        storage.archive_event(event)
+    if isinstance(storage, JsonStorage):
+        storage.compact([event for event in events if event.get("show", True)])
+    storage.close()
+    return len(closed)
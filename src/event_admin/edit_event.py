@@ -7,7 +7,7 @@ from telegram import (
 )
 from telegram.ext import ContextTypes, ConversationHandler, CallbackQueryHandler, MessageHandler, filters
 
-from event_admin.data_manager import save_events, save_working_event
+from event_admin.data_manager import save_edited_event, get_event
 # Import the shared constants
 from event_admin.constants import (
     MAIN_MENU,
@@ -83,13 +83,12 @@ async def edit_event_name_input(update: Update, context: ContextTypes.DEFAULT_TY
     context.user_data["working_event"]["name"] = event_name
     
     # Update the corresponding event in bot_data
-    for e in context.bot_data["events"]:
-        if e["id"] == context.user_data["working_event"]["id"]:
-            e["name"] = event_name
-            break
+    event = get_event(context, context.user_data["working_event"]["id"])
+    if event:
+        event["name"] = event_name
     
-    # Save the updated events list
-    save_events(context.bot_data)
+    # Save the updated event
+    save_edited_event(context)
     
     await update.message.reply_text(f"Event name updated to '{event_name}'.")
     return await menu.show_event_edit_menu(update, context)  # Go back to the edit menu
@@ -136,7 +135,7 @@ async def edit_event_date_input(update: Update, context: ContextTypes.DEFAULT_TY
         
     context.user_data["working_event"]["date"] = date_text
 
-    save_working_event(context)
+    save_edited_event(context)
 
     await update.message.reply_text(f"Date set to '{date_text}'.")
     return await menu.show_event_edit_menu(update, context)
@@ -150,7 +149,7 @@ async def edit_event_date_callback(update: Update, context: ContextTypes.DEFAULT
     if data == NO_DATE:
         # Set the event date to None
         context.user_data["working_event"]["date"] = None
-        save_working_event(context)
+        save_edited_event(context)
         return await menu.show_event_edit_menu(update, context)
 
     elif data == BACK_TO_EDIT_EVENT_MENU:
@@ -208,7 +207,7 @@ async def edit_event_start_time_input(update: Update, context: ContextTypes.DEFA
             
     context.user_data["working_event"]["start_time"] = start_time
     
-    save_working_event(context)
+    save_edited_event(context)
     
     await update.message.reply_text(f"Start time set to {start_time}.")
     return await menu.show_event_edit_menu(update, context)
@@ -221,7 +220,7 @@ async def edit_event_start_time_callback(update: Update, context: ContextTypes.D
 
     if data == NO_START_TIME:
         context.user_data["working_event"]["start_time"] = None
-        save_working_event(context)
+        save_edited_event(context)
 
         await query.edit_message_text("Start time set to None.")
         return await menu.show_event_edit_menu(update, context)
@@ -281,7 +280,7 @@ async def edit_event_end_time_input(update: Update, context: ContextTypes.DEFAUL
             
     context.user_data["working_event"]["end_time"] = end_time
     
-    save_working_event(context)
+    save_edited_event(context)
     
     await update.message.reply_text(f"Start time set to {end_time}.")
     return await menu.show_event_edit_menu(update, context)
@@ -294,7 +293,7 @@ async def edit_event_end_time_callback(update: Update, context: ContextTypes.DEF
 
     if data == NO_END_TIME:
         context.user_data["working_event"]["end_time"] = None
-        save_working_event(context)
+        save_edited_event(context)
 
         await query.edit_message_text("End time set to None.")
         return await menu.show_event_edit_menu(update, context)
@@ -340,7 +339,7 @@ async def edit_event_capacity_input(update: Update, context: ContextTypes.DEFAUL
     context.user_data["working_event"]["has_capacity"] = True
     context.user_data["working_event"]["capacity"] = capacity
 
-    save_working_event(context)
+    save_edited_event(context)
 
     await update.message.reply_text(f"Capacity set to {capacity}.")
     return await menu.show_event_edit_menu(update, context)
@@ -354,7 +353,7 @@ async def edit_event_capacity_callback(update: Update, context: ContextTypes.DEF
     if data == NO_CAPACITY:
         context.user_data["working_event"]["has_capacity"] = False
         context.user_data["working_event"]["capacity"] = 65536 # When an event goes from having a capacity to no capacity, we need to run update waitlist. That needs capacity to be a big number.
-        save_working_event(context)
+        save_edited_event(context)
 
         await query.edit_message_text("Capacity set to None.")
         return await menu.show_event_edit_menu(update, context)
@@ -405,7 +404,7 @@ async def edit_event_location_input(update: Update, context: ContextTypes.DEFAUL
         context.user_data["working_event"]["location"] = location_text
         context.user_data["working_event"]["location_link"] = None
         
-    save_working_event(context)
+    save_edited_event(context)
 
     await update.message.reply_text("Location updated.")
     return await menu.show_event_edit_menu(update, context)
@@ -419,7 +418,7 @@ async def edit_event_location_callback(update: Update, context: ContextTypes.DEF
     if data == NO_LOCATION:
         context.user_data["working_event"]["location"] = "To be announced"
 
-        save_working_event(context)
+        save_edited_event(context)
 
         await query.edit_message_text("Location set to 'To be announced'.")
         return await menu.show_event_edit_menu(update, context)
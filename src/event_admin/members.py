@@ -0,0 +1,149 @@
+# event_admin/members.py
+
+import bisect
+from utils.markdown import escape_markdown_v2
+
+# Per-event index of who is on the attendees and waitlist lists.
+# event["attendees"] and event["waitlist"] stay ordinary ordered lists (that is
+# what gets saved); this index maps user_id -> (list name, position) next to
+# them so membership checks and entry updates don't scan the lists.
+# A sorted list of (lowercase username, user_id) is added to the index the
+# first time someone searches the event by username, and kept sorted after that.
+# In the same way the members' "@username" handles, escaped for MarkdownV2, are
+# added the first time an announcement is rendered, so each is escaped once.
+# Lookups and appends are O(1). Removing an entry is O(n) in the length of its
+# list: list.pop shifts the later entries, and their positions are renumbered.
+MEMBER_LISTS = ("attendees", "waitlist")
+
+_indexes = {}
+
+
+def _build_index(event: dict) -> dict:
+    index = {"lists": {}, "sizes": {}, "by_user": {}}
+    for list_name in MEMBER_LISTS:
+        entries = event.setdefault(list_name, [])
+        index["lists"][list_name] = entries
+        index["sizes"][list_name] = len(entries)
+        for position, entry in enumerate(entries):
+            index["by_user"][entry["user_id"]] = (list_name, position)
+    _indexes[event["id"]] = index
+    return index
+
+
+def _get_index(event: dict) -> dict:
+    """Returns the event's index, rebuilding it if the lists were replaced or changed elsewhere."""
+    index = _indexes.get(event["id"])
+    if index is not None:
+        for list_name in MEMBER_LISTS:
+            entries = event.get(list_name)
+            if index["lists"][list_name] is not entries or index["sizes"][list_name] != len(entries):
+                index = None
+                break
+    if index is None:
+        index = _build_index(event)
+    return index
+
+
+def forget_event_index(event_id: int) -> None:
+    """Drops the event's index, e.g. once the event is archived."""
+    _indexes.pop(event_id, None)
+
+
+def _escaped_handle(entry: dict) -> str:
+    return escape_markdown_v2(f"@{entry['username']}")
+
+
+def escaped_handles(event: dict, list_name: str) -> list:
+    """
+    The "@username" handles of the list's members escaped for MarkdownV2, in
+    the list's order. The returned list belongs to the index; don't change it.
+    """
+    index = _get_index(event)
+    handles = index.get("handles")
+    if handles is None:
+        handles = index["handles"] = {
+            name: [_escaped_handle(entry) for entry in index["lists"][name]]
+            for name in MEMBER_LISTS
+        }
+    return handles[list_name]
+
+
+def find_member(event: dict, user_id: int):
+    """
+    Returns (list_name, entry) for the user in the event, where list_name is
+    "attendees" or "waitlist". Returns (None, None) if the user is in neither.
+    """
+    index = _get_index(event)
+    found = index["by_user"].get(user_id)
+    if found is None:
+        return None, None
+    list_name, position = found
+    return list_name, index["lists"][list_name][position]
+
+
+def add_member(event: dict, list_name: str, entry: dict) -> None:
+    """Appends the entry to the end of the event's list."""
+    index = _get_index(event)
+    entries = index["lists"][list_name]
+    entries.append(entry)
+    index["sizes"][list_name] = len(entries)
+    index["by_user"][entry["user_id"]] = (list_name, len(entries) - 1)
+    if "handles" in index:
+        index["handles"][list_name].append(_escaped_handle(entry))
+    if "usernames" in index and entry.get("username"):
+        bisect.insort(index["usernames"], (entry["username"].lower(), entry["user_id"]))
+
+
+def _remove_at(index: dict, list_name: str, position: int) -> dict:
+    entries = index["lists"][list_name]
+    entry = entries.pop(position)
+    index["sizes"][list_name] = len(entries)
+    del index["by_user"][entry["user_id"]]
+    if "handles" in index:
+        del index["handles"][list_name][position]
+    if "usernames" in index and entry.get("username"):
+        usernames = index["usernames"]
+        key = (entry["username"].lower(), entry["user_id"])
+        position_in_names = bisect.bisect_left(usernames, key)
+        if position_in_names < len(usernames) and usernames[position_in_names] == key:
+            del usernames[position_in_names]
+    # Only the entries after the removed one move up a place.
+    for later in range(position, len(entries)):
+        index["by_user"][entries[later]["user_id"]] = (list_name, later)
+    return entry
+
+
+def remove_member(event: dict, user_id: int):
+    """
+    Removes the user from whichever list they are on.
+    Returns the name of that list, or None if the user was not in the event.
+    """
+    index = _get_index(event)
+    found = index["by_user"].get(user_id)
+    if found is None:
+        return None
+    list_name, position = found
+    _remove_at(index, list_name, position)
+    return list_name
+
+
+def find_by_username_prefix(event: dict, prefix: str):
+    """
+    Returns (list_name, position) of the user whose username comes first
+    alphabetically among those starting with `prefix` (case-insensitive, a
+    leading "@" is ignored). Returns (None, None) if no username matches.
+    """
+    index = _get_index(event)
+    usernames = index.get("usernames")
+    if usernames is None:
+        usernames = index["usernames"] = sorted(
+            (entry["username"].lower(), entry["user_id"])
+            for list_name in MEMBER_LISTS
+            for entry in index["lists"][list_name]
+            if entry.get("username")
+        )
+    prefix = prefix.strip().lstrip("@").lower()
+    found = bisect.bisect_left(usernames, (prefix,))
+    if found == len(usernames) or not usernames[found][0].startswith(prefix):
+        return None, None
+    return index["by_user"][usernames[found][1]]
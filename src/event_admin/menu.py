@@ -5,10 +5,12 @@ sys.path.append("..")
 from config.config import event_admins
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes, ConversationHandler
-from event_admin.data_manager import is_event_admin, save_events, load_events
+from event_admin.data_manager import is_event_admin, save_working_event, next_event_id, get_event, add_event
 from event_admin import edit_event, announcement, rsvp_admin
 import rsvp as rsvp
 from event_admin.close import ask_to_close_event
+from event_admin import archive
+from event_admin.actors import run_serially
 
 # Now import from your constants
 from event_admin.constants import (
@@ -104,6 +106,7 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, edi
     buttons = [
         [InlineKeyboardButton("New Event", callback_data="new_event")],
         [InlineKeyboardButton("Events", callback_data="my_events")],
+        [InlineKeyboardButton("Archived Events", callback_data="archived_events")],
         [InlineKeyboardButton("Close", callback_data="close")]
     ]
     keyboard = InlineKeyboardMarkup(buttons)
@@ -135,6 +138,9 @@ async def main_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     elif data == "my_events":
         return await show_my_events(update, context)
 
+    elif data == "archived_events":
+        return await archive.show_archived_events(update, context)
+
     elif data == "close":
         # End conversation
         await query.edit_message_text("Okay, bye.")
@@ -173,7 +179,7 @@ async def new_event_name_input(update: Update, context: ContextTypes.DEFAULT_TYP
             return NEW_EVENT_NAME
 
     # Assign an ID
-    new_id = max([e["id"] for e in events], default=0) + 1
+    new_id = next_event_id(context)
 
     # Build the new event dictionary
     event_data = {
@@ -197,13 +203,12 @@ async def new_event_name_input(update: Update, context: ContextTypes.DEFAULT_TYP
     }
 
     # Add the new event to the list
-    events.append(event_data)
-    context.bot_data["events"] = events  # update in memory
+    add_event(context, event_data)
     # Set the working event
     context.user_data["working_event"] = event_data
 
-    # SAVE the events to your JSON file
-    save_events(context)
+    # SAVE the new event
+    save_working_event(context)
 
     # Now show the Edit Event menu. Must send a new message (user typed the event name).
     return await show_event_edit_menu(update, context)
@@ -265,8 +270,7 @@ async def my_events_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if data.startswith("select_event_"):
         # Load the chosen event into working_event
         event_id = int(data.split("_")[-1])
-        events = context.bot_data.get("events", [])
-        selected_event = next((ev for ev in events if ev["id"] == event_id), None)
+        selected_event = get_event(context, event_id)
         if not selected_event:
             await query.edit_message_text("Selected event not found.")
             return MY_EVENTS
@@ -420,7 +424,8 @@ async def rsvp_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     elif data == MESSEAGE_RSVP:
         return await rsvp_admin.message_rsvp(update, context)
     elif data == UPDATE_WAITLIST:
-        await rsvp.promote_from_waitlist(update, context, context.user_data["working_event"])
+        event_data = context.user_data["working_event"]
+        await run_serially(event_data["id"], rsvp.promote_from_waitlist, update, context, event_data)
         return await show_rsvp_menu(update, context, edit=False)
     elif data == BACK_TO_EVENT_MENU:
         return await show_event_menu(update, context)
@@ -5,7 +5,7 @@ from telegram import (
 )
 from telegram.ext import ContextTypes, ConversationHandler
 
-from .data_manager import save_events, is_event_admin
+from .data_manager import save_events, is_event_admin, get_event
 from .menu import show_main_menu
 from .announcement import start_add_announcement, show_announcement_preview
 
@@ -102,11 +102,7 @@ async def my_events_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def show_event_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, event_id: int):
     """Show the event menu for a specific event."""
-    event = None
-    for e in context.bot_data.get("events", []):
-        if e["id"] == event_id:
-            event = e
-            break
+    event = get_event(context, event_id)
 
     if not event:
         if update.callback_query:
@@ -213,8 +209,7 @@ async def event_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def show_event_info(query, context: ContextTypes.DEFAULT_TYPE, event_id: int):
     """Show detailed event info including announcements, attendees, etc."""
-    events = context.bot_data.get("events", [])
-    event = next((e for e in events if e["id"] == event_id), None)
+    event = get_event(context, event_id)
     if not event:
         await query.edit_message_text("Event not found.")
         return
@@ -252,8 +247,7 @@ async def show_event_info(query, context: ContextTypes.DEFAULT_TYPE, event_id: i
 
 async def show_attendees(query, context: ContextTypes.DEFAULT_TYPE, event_id: int):
     """Show the list of attendees and waitlist."""
-    events = context.bot_data.get("events", [])
-    event = next((e for e in events if e["id"] == event_id), None)
+    event = get_event(context, event_id)
     if not event:
         await query.edit_message_text("Event not found.")
         return
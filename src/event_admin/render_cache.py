@@ -0,0 +1,45 @@
+# event_admin/render_cache.py
+
+from utils import metrics
+
+# Rendered text and keyboards that only depend on an event's details (name,
+# date, times, location, capacity, announcement text), not on who has RSVP'd.
+# Every edit of those details bumps event["version"] (see
+# data_manager.save_edited_event), which makes everything cached for the
+# previous version stale.
+#
+# event_id -> {"version": version the fragments were rendered from, "fragments": {name: value}}
+_cache = {}
+
+
+def event_version(event: dict) -> int:
+    return event.get("version", 0)
+
+
+def bump_version(event: dict) -> None:
+    """Record that the event's details changed, so its cached renders are not used again."""
+    event["version"] = event_version(event) + 1
+    _cache.pop(event["id"], None)
+
+
+def forget_event_renders(event_id: int) -> None:
+    """Drop everything cached for the event, e.g. once it is archived."""
+    _cache.pop(event_id, None)
+
+
+def cached_render(event: dict, fragment: str, render):
+    """
+    Returns `render(event)` for this fragment of the event, rendering it only
+    once per event version. `fragment` names what is rendered, e.g. "header".
+    """
+    version = event_version(event)
+    entry = _cache.get(event["id"])
+    if entry is None or entry["version"] != version:
+        entry = _cache[event["id"]] = {"version": version, "fragments": {}}
+    fragments = entry["fragments"]
+    if fragment in fragments:
+        metrics.increment("render_cache_hits")
+        return fragments[fragment]
+    metrics.increment("render_cache_misses")
+    value = fragments[fragment] = render(event)
+    return value
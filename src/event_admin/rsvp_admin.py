@@ -9,6 +9,10 @@ from telegram.constants import ParseMode
 from event_admin import menu, announcement
 import rsvp 
 from event_admin.data_manager import save_working_event
+from event_admin.broadcast import build_audience, start_broadcast
+from event_admin.members import find_by_username_prefix
+from config import config
+from utils.markdown import escape_markdown_v2, escape_value
 from event_admin.constants import (
     MAIN_MENU,
     NEW_EVENT_NAME,
@@ -28,7 +32,8 @@ from event_admin.constants import (
     ANNOUNCEMENT_EDIT_POSTED_ANNOUNCEMENT_TEXT,
     RSVP_MENU,
     MESSAGE_RSVP_INPUT,
-    MESSAGE_RSVP_WHOM
+    MESSAGE_RSVP_WHOM,
+    VIEW_ATTENDEES
 )
 
 # We'll define some internal states or callbacks:
@@ -40,65 +45,144 @@ MESSAGE_RSVP = "message_rsvp"
 # Additional constants for the "who to message" sub-menu:
 MESSAGE_ATTENDEES = "msg_attendees"
 MESSAGE_WAITLIST = "msg_waitlist"
+MESSAGE_BOTH = "msg_both"
 BACK_TO_RSVP_MENU = "back_to_rsvp_menu"
 UPDATE_WAITLIST = "update_waitlist"
-def escape_markdown_v2(text: str) -> str:
-    """
-    Escapes Markdown V2 special characters in the given text.
-    See: https://core.telegram.org/bots/api#markdownv2-style
-    """
-    # Characters that must be escaped in MarkdownV2:
-    # _ * [ ] ( ) ~ ` > # + - = | { } . !
-    pattern = r'([\_\*\[\]\(\)\~\`\>\#\+\-\=\|\{\}\.\!])'
-    return re.sub(pattern, r'\\\1', text)
+# Callback data prefix of the attendee list's page buttons, followed by the page number
+ATTENDEE_PAGE = "attendee_page:"
+
+# Number of people on one page of the attendee list. Pages are made smaller
+# if this many of the longest possible lines would not fit in one message.
+ATTENDEE_PAGE_SIZE = getattr(config, "attendee_page_size", 25)
+
+# Telegram's limit for the text of one message
+MESSAGE_LIMIT = 4096
+# Longest possible line of the attendee list, as MarkdownV2: the marker, a
+# number, first and last name (up to 64 characters each on Telegram) and the
+# username (up to 32), with every character escaped, and the newline.
+MAX_ATTENDEE_LINE = len("➡️ ") + len("99999\\. ") + 2 * 64 + 1 + 2 * 64 + len(" @") + 2 * 32 + 1
+# Room for the list titles and the page footer
+ATTENDEE_PAGE_EXTRA = 200
+
+AUDIENCE_LABELS = {"attendees": "attendees", "waitlist": "waitlist", "both": "attendees and waitlist"}
 
 async def view_attending(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Show a list of attendees and waitlist, then send a separate message
-    with the RSVP menu again.
+    Show the first page of attendees and waitlist. Admins can move between
+    pages with the Prev/Next buttons or send a username to jump to its page.
     """
-    query = update.callback_query
-    event_data = context.user_data["working_event"]
+    return await show_attendee_page(update, context, 0)
+
 
+def attendee_at(event_data: dict, position: int):
+    """
+    Returns (list_name, number on that list, entry) for a position in the
+    attendees followed by the waitlist.
+    """
     attendees = event_data.get("attendees", [])
-    waitlist = event_data.get("waitlist", [])
+    if position < len(attendees):
+        return "attendees", position + 1, attendees[position]
+    return "waitlist", position - len(attendees) + 1, event_data["waitlist"][position - len(attendees)]
 
-    # Build text
-    text = (
+
+def render_attendee_header(event_data: dict) -> str:
+    return escape_markdown_v2(
         f"Event: {event_data['name']}\n"
         f"Date: {event_data.get('date', 'None')}\n"
         f"Start: {event_data.get('start_time', 'None')}\n"
         f"End: {event_data.get('end_time', 'None')}\n\n"
     )
-    text = announcement.escape_markdown_v2(text)
-    text += "*Attendees:*\n"
-    if not attendees:
-        text += "No one is attending yet\.\n"
+
+
+def attendee_page_size(event_data: dict) -> int:
+    """
+    Number of people on each page of the event's attendee list: at most
+    ATTENDEE_PAGE_SIZE, and few enough that a page of the longest possible
+    lines stays within Telegram's message limit.
+    """
+    room = MESSAGE_LIMIT - len(render_attendee_header(event_data)) - ATTENDEE_PAGE_EXTRA
+    return max(1, min(ATTENDEE_PAGE_SIZE, room // MAX_ATTENDEE_LINE))
+
+
+def render_attendee_page(event_data: dict, page: int, highlight_user_id: int = None):
+    """
+    Render one page of the attendees followed by the waitlist, with only the
+    entries on that page visited. Returns (text, keyboard).
+    """
+    total = len(event_data.get("attendees", [])) + len(event_data.get("waitlist", []))
+    page_size = attendee_page_size(event_data)
+    pages = max(1, -(-total // page_size))
+    page = min(max(page, 0), pages - 1)
+
+    text = render_attendee_header(event_data)
+    lines = []
+    if not event_data.get("attendees"):
+        lines.append("*Attendees:*\nNo one is attending yet\\.")
+    current_list = None
+    for position in range(page * page_size, min(total, (page + 1) * page_size)):
+        list_name, number, entry = attendee_at(event_data, position)
+        if list_name != current_list:
+            # The list's title goes on every page that has entries from it
+            title = "*Attendees:*" if list_name == "attendees" else "*Waitlist:*"
+            if number > 1:
+                title += " \\(continued\\)"
+            lines.append(("\n" if lines else "") + title)
+            current_list = list_name
+        first = entry.get("first_name") or ""
+        last = entry.get("last_name") or ""
+        uname = entry.get("username") or ""
+        marker = "➡️ " if entry["user_id"] == highlight_user_id else ""
+        lines.append(f"{marker}{number}\\. {escape_value(first)} {escape_value(last)} @{escape_value(uname)}")
+    text += "\n".join(lines)
+    text += f"\n\n_Page {page + 1} of {pages}\\. Send a username to find someone\\._"
+
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("<< Prev", callback_data=f"{ATTENDEE_PAGE}{page - 1}"))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton("Next >>", callback_data=f"{ATTENDEE_PAGE}{page + 1}"))
+    buttons = [navigation] if navigation else []
+    buttons.append([InlineKeyboardButton("<< Back", callback_data=BACK_TO_RSVP_MENU)])
+    return text, InlineKeyboardMarkup(buttons)
+
+
+async def show_attendee_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int, highlight_user_id: int = None):
+    event_data = context.user_data["working_event"]
+    text, keyboard = render_attendee_page(event_data, page, highlight_user_id)
+    if update.callback_query:
+        await update.callback_query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=keyboard)
     else:
-        for idx, a in enumerate(attendees, start=1):
-            first = a.get("first_name") or ""
-            last = a.get("last_name") or ""
-            uname = a.get("username") or ""
-            text += escape_markdown_v2(f"{idx}. {first} {last} @{uname}\n")
-
-    if waitlist:
-        text += "\n*Waitlist:*\n"
-        for idx, w in enumerate(waitlist, start=1):
-            first = w.get("first_name") or ""
-            last = w.get("last_name") or ""
-            uname = w.get("username") or ""
-            text += escape_markdown_v2(f"{idx}. {first} {last} @{uname}\n")
-
-    # Send a new message with the list
+        await update.effective_chat.send_message(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=keyboard)
+    return VIEW_ATTENDEES
+
+
+async def attendee_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle the Prev/Next and Back buttons of the attendee list."""
+    query = update.callback_query
+    data = query.data
     await query.answer()
-    await query.edit_message_text(
-        text,
-        parse_mode=ParseMode.MARKDOWN_V2
-    )
 
-    
-    return await menu.show_rsvp_menu(update, context, edit = False)
-    
+    if data.startswith(ATTENDEE_PAGE):
+        return await show_attendee_page(update, context, int(data[len(ATTENDEE_PAGE):]))
+    elif data == BACK_TO_RSVP_MENU:
+        return await menu.show_rsvp_menu(update, context)
+
+    await query.edit_message_text("Unknown action.")
+    return await menu.show_rsvp_menu(update, context, edit=False)
+
+
+async def find_attendee_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """The admin sent a username (or the start of one) while looking at the attendee list."""
+    event_data = context.user_data["working_event"]
+    prefix = update.message.text.strip()
+    list_name, index = find_by_username_prefix(event_data, prefix)
+    if list_name is None:
+        await update.message.reply_text(f"No attendee or waitlisted user has a username starting with {prefix}.")
+        return VIEW_ATTENDEES
+
+    position = index if list_name == "attendees" else len(event_data["attendees"]) + index
+    entry = event_data[list_name][index]
+    return await show_attendee_page(update, context, position // attendee_page_size(event_data), entry["user_id"])
 
 
 async def message_rsvp(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -133,6 +217,9 @@ async def message_rsvp(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 InlineKeyboardButton("Attending", callback_data=MESSAGE_ATTENDEES),
                 InlineKeyboardButton("Waitlist", callback_data=MESSAGE_WAITLIST),
             ],
+            [
+                InlineKeyboardButton("Attending & Waitlist", callback_data=MESSAGE_BOTH)
+            ],
             [
                 InlineKeyboardButton("<< Back", callback_data=BACK_TO_RSVP_MENU)
             ]
@@ -155,13 +242,15 @@ async def message_rsvp_whom_callback(update: Update, context: ContextTypes.DEFAU
         context.user_data["msg_rsvp_whom"] = "attendees"
     elif data == MESSAGE_WAITLIST:
         context.user_data["msg_rsvp_whom"] = "waitlist"
+    elif data == MESSAGE_BOTH:
+        context.user_data["msg_rsvp_whom"] = "both"
     else:
         # Unknown action
         await query.edit_message_text("Unknown action.")
-        return menu.sh
+        return await menu.show_rsvp_menu(update, context, edit=False)
 
     # Now ask for the message
-    text = f"What would you like to send to the {context.user_data['msg_rsvp_whom']}?"
+    text = f"What would you like to send to the {AUDIENCE_LABELS[context.user_data['msg_rsvp_whom']]}?"
     buttons = [
         [
             InlineKeyboardButton("<< Back", callback_data=BACK_TO_RSVP_MENU)
@@ -174,8 +263,9 @@ async def message_rsvp_whom_callback(update: Update, context: ContextTypes.DEFAU
 
 async def message_rsvp_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Admin typed the message to send to either 'attendees' or 'waitlist'.
-    We then DM each user and list the ones we couldn't message.
+    Admin typed the message to send to 'attendees', 'waitlist' or 'both'.
+    The DMs are sent by a background broadcast, which reports progress and
+    the users it couldn't message in a status message.
     """
     # Use text_markdown_v2 or fallback
     msg_text = update.message.text_markdown_v2 or update.message.text
@@ -190,34 +280,13 @@ async def message_rsvp_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
         f"{msg_text}"
     )
 
-    # Identify the relevant list
-    if whom == "attendees":
-        user_list = event_data.get("attendees", [])
-    else:
-        user_list = event_data.get("waitlist", [])
-
-    failed = []
-    succeeded = 0
-
-    for user_info in user_list:
-        chat_id = user_info["user_id"]
-        try:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=final_text,
-                parse_mode=ParseMode.MARKDOWN_V2
-            )
-            succeeded += 1
-        except Exception as e:
-            print(f"[ERROR] Could not send DM to {chat_id}: {e}")
-            failed.append(user_info.get("username") or "UnknownUser")
-
-    # Provide admin with a summary
-    text_resp = f"Message sent to {succeeded}/{len(user_list)} {whom}.\n"
-    if failed:
-        text_resp += "Unable to send to:\n" + ", ".join(failed)
-
-    await update.message.reply_text(text_resp)
+    # Snapshot who gets the message; RSVPs made while it is being sent don't change it
+    user_list = build_audience(event_data, whom)
+    label = AUDIENCE_LABELS[whom]
+
+    # The DMs are sent in the background and this message shows their progress
+    status_message = await update.message.reply_text(f"Sending message to {len(user_list)} {label}...")
+    start_broadcast(context, user_list, final_text, label, status_message)
 
     # Return to RSVP menu
     return await menu.show_rsvp_menu(update, context, edit=False)
@@ -0,0 +1,549 @@
+# event_admin/storage.py
+
+import os
+import json
+import time
+import hashlib
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+from utils import metrics
+
+MEMBER_LISTS = ("attendees", "waitlist")
+
+# Version of the snapshot layout written by write_snapshot(). Files without a
+# format_version are the original {"events": [...]} layout and are still read.
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+def _snapshot_checksum(body: dict) -> str:
+    canonical = json.dumps(body, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _fsync_directory(path: str) -> None:
+    # Makes a rename inside the directory durable. Not possible on Windows.
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_snapshot(data_file: str, body: dict, backups: int = 3) -> None:
+    """
+    Writes body ({"journal_seq": ..., "events": [...]}) to data_file atomically:
+    the new file is written and fsynced under a temporary name, the previous
+    snapshots are rotated to data_file.1 ... data_file.<backups>, and the new
+    file is renamed into place. A crash at any point leaves a complete file.
+    """
+    snapshot = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "checksum": _snapshot_checksum(body),
+        **body,
+    }
+    tmp_file = data_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if os.path.exists(data_file):
+        for number in range(backups - 1, 0, -1):
+            older = f"{data_file}.{number}"
+            if os.path.exists(older):
+                os.replace(older, f"{data_file}.{number + 1}")
+        if backups > 0:
+            os.replace(data_file, f"{data_file}.1")
+
+    os.replace(tmp_file, data_file)
+    _fsync_directory(os.path.dirname(data_file) or ".")
+
+
+def read_snapshot(data_file: str) -> dict:
+    """
+    Reads and verifies a snapshot written by write_snapshot().
+    Raises ValueError if the file is incomplete or its checksum does not match.
+    """
+    with open(data_file, "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+
+    if snapshot.get("format_version", 1) > SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"{data_file} was written by a newer version of the bot")
+    if "checksum" in snapshot:
+        body = {key: value for key, value in snapshot.items() if key not in ("format_version", "checksum")}
+        if _snapshot_checksum(body) != snapshot["checksum"]:
+            raise ValueError(f"{data_file} does not match its checksum")
+    return snapshot
+
+
+def read_latest_snapshot(data_file: str, backups: int = 3):
+    """
+    Returns (snapshot, damaged_files): the newest snapshot that is complete and
+    matches its checksum, trying data_file first and then data_file.1,
+    data_file.2, ..., plus the files that had to be skipped.
+    """
+    candidates = [data_file] + [f"{data_file}.{number}" for number in range(1, backups + 1)]
+    errors = []
+    for candidate in candidates:
+        if not os.path.exists(candidate):
+            continue
+        try:
+            snapshot = read_snapshot(candidate)
+        except (OSError, ValueError) as ex:
+            print(f"[Storage] Could not read {candidate}: {ex}")
+            errors.append(candidate)
+            continue
+        if errors:
+            print(f"[Storage] Recovered from {candidate}; changes saved after it may be missing.")
+            metrics.increment("snapshot_recoveries")
+        return snapshot, errors
+
+    if errors:
+        raise RuntimeError(f"No readable snapshot found; tried {', '.join(errors)}")
+    return {"events": []}, []
+
+
+def _find_member(event: dict, list_name: str, user_id: int):
+    for idx, entry in enumerate(event.setdefault(list_name, [])):
+        if entry["user_id"] == user_id:
+            return idx
+    return None
+
+
+def apply_journal_record(events: list, events_by_id: dict, record: dict) -> None:
+    """
+    Applies one journal record to the events. Records are idempotent, so
+    replaying a record that is already in the snapshot changes nothing.
+    """
+    op = record["op"]
+    event_id = record["event"]
+
+    if op == "event_archived":
+        event = events_by_id.pop(event_id, None)
+        if event is not None:
+            events.remove(event)
+        return
+    if op == "event_restored":
+        if event_id not in events_by_id:
+            events.append(record["fields"])
+            events_by_id[event_id] = record["fields"]
+        return
+    if op in ("event_edited", "event_closed"):
+        fields = record["fields"]
+        event = events_by_id.get(event_id)
+        if event is None:
+            event = dict(fields, attendees=[], waitlist=[])
+            events.append(event)
+            events_by_id[event_id] = event
+        else:
+            event.update(fields)
+        return
+
+    event = events_by_id.get(event_id)
+    if event is None:
+        return
+
+    if op == "rsvp_added":
+        if _find_member(event, record["list"], record["entry"]["user_id"]) is None:
+            event[record["list"]].append(record["entry"])
+    elif op == "rsvp_cancelled":
+        idx = _find_member(event, record["list"], record["user"])
+        if idx is not None:
+            del event[record["list"]][idx]
+    elif op == "rsvp_updated":
+        idx = _find_member(event, record["list"], record["entry"]["user_id"])
+        if idx is not None:
+            event[record["list"]][idx] = record["entry"]
+    elif op == "promoted":
+        idx = _find_member(event, "waitlist", record["entry"]["user_id"])
+        if idx is not None:
+            del event["waitlist"][idx]
+        if _find_member(event, "attendees", record["entry"]["user_id"]) is None:
+            event["attendees"].append(record["entry"])
+
+
+class JsonStorage:
+    """
+    Keeps the active events in a JSON snapshot (data/bot_data.json) plus an
+    append-only journal of changes (data/bot_data.journal). Each change is one
+    short line in the journal; compact() turns the journal into a new snapshot
+    every `compact_interval` seconds or `compact_records` records. The journal
+    written since the previous snapshot is kept as data/bot_data.journal.1
+    (and older ones as .2, .3, ...), rotated together with the snapshots, so a
+    rotated snapshot can still be brought up to date if a newer one is damaged.
+    Closed events are moved to data/archive.json, which is only read on request.
+    All methods except compaction_due() run on the BackgroundWriter thread.
+    """
+
+    def __init__(self, data_file: str, compact_interval: float = 300, compact_records: int = 1000, backups: int = 3):
+        self.data_file = data_file
+        self.backups = backups
+        self.journal_file = os.path.splitext(data_file)[0] + ".journal"
+        self.archive_file = os.path.join(os.path.dirname(data_file), "archive.json")
+        self.highest_id = 0
+        self.compact_interval = compact_interval
+        self.compact_records = compact_records
+        self.seq = 0
+        self.pending_records = 0
+        self.last_compaction = time.monotonic()
+        self.journal = None
+
+    def load_events(self) -> list:
+        """
+        Loads the newest good snapshot (falling back to rotated copies if the
+        latest one is damaged) and replays the journal written after it.
+        """
+        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
+        snapshot, damaged_files = read_latest_snapshot(self.data_file, self.backups)
+        # Keep damaged files for inspection, but out of the backup rotation.
+        for damaged_file in damaged_files:
+            os.replace(damaged_file, f"{damaged_file}.damaged")
+        events = snapshot.get("events", [])
+        self.seq = snapshot.get("journal_seq", 0)
+        self.highest_id = snapshot.get("highest_event_id", 0)
+
+        events_by_id = {event["id"]: event for event in events}
+        replayed = 0
+        # Records already in the snapshot are skipped, so every segment can be
+        # read; the older ones only matter if an older snapshot was loaded.
+        for journal_file in self._journal_segments():
+            if not os.path.exists(journal_file):
+                continue
+            with open(journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # The bot stopped in the middle of writing this record.
+                        print(f"[Storage] Ignoring incomplete journal record in {journal_file}: {line!r}")
+                        break
+                    if record["seq"] <= self.seq:
+                        continue
+                    apply_journal_record(events, events_by_id, record)
+                    self.seq = record["seq"]
+                    self.highest_id = max(self.highest_id, record["event"])
+                    replayed += 1
+        if replayed:
+            print(f"[Storage] Replayed {replayed} journal records.")
+
+        # Start from a fresh snapshot so the journal only holds new changes.
+        self.compact(events)
+        return events
+
+    def max_event_id(self) -> int:
+        """Returns the highest event ID ever stored, including archived events."""
+        return self.highest_id
+
+    def _append(self, op: str, event_id: int, **fields) -> None:
+        self.seq += 1
+        self.highest_id = max(self.highest_id, event_id)
+        record = {"seq": self.seq, "op": op, "event": event_id, **fields}
+        if self.journal is None:
+            self.journal = open(self.journal_file, "a", encoding="utf-8")
+        self.journal.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        # Hand the line to the OS right away; it is fsynced on the next flush.
+        self.journal.flush()
+        self.pending_records += 1
+        metrics.increment("journal_records")
+
+    def save_all(self, events: list) -> None:
+        for event in events:
+            self.save_event(event)
+
+    def save_event(self, event: dict) -> None:
+        fields = {key: value for key, value in event.items() if key not in MEMBER_LISTS}
+        op = "event_edited" if event.get("show", True) else "event_closed"
+        self._append(op, event["id"], fields=fields)
+
+    def add_member(self, event_id: int, list_name: str, entry: dict) -> None:
+        self._append("rsvp_added", event_id, list=list_name, entry=entry)
+
+    def remove_member(self, event_id: int, list_name: str, user_id: int) -> None:
+        self._append("rsvp_cancelled", event_id, list=list_name, user=user_id)
+
+    def update_member(self, event_id: int, list_name: str, entry: dict) -> None:
+        self._append("rsvp_updated", event_id, list=list_name, entry=entry)
+
+    def promote_member(self, event_id: int, entry: dict) -> None:
+        self._append("promoted", event_id, entry=entry)
+
+    def compaction_due(self, force: bool = False) -> bool:
+        """True if the journal has records and it is time to write a new snapshot."""
+        if not self.pending_records:
+            return False
+        if force:
+            return True
+        due = time.monotonic() - self.last_compaction >= self.compact_interval
+        return due or self.pending_records >= self.compact_records
+
+    def sync(self) -> None:
+        """Makes the journal records written so far durable."""
+        if self.journal is not None:
+            os.fsync(self.journal.fileno())
+
+    def _journal_segments(self) -> list:
+        """The journal files, oldest first: the rotated segments, then the current journal."""
+        rotated = [f"{self.journal_file}.{number}" for number in range(self.backups, 0, -1)]
+        return rotated + [self.journal_file]
+
+    def compact(self, events: list) -> None:
+        """Writes a new snapshot and starts a new journal, keeping the old one with the rotated snapshot."""
+        self.highest_id = max([self.highest_id] + [event["id"] for event in events])
+        body = {"journal_seq": self.seq, "highest_event_id": self.highest_id, "events": events}
+        write_snapshot(self.data_file, body, self.backups)
+
+        # Every record up to journal_seq is in the new snapshot, but the
+        # previous snapshot (now data_file.1) still needs them.
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if os.path.exists(self.journal_file) and self.backups > 0:
+            for number in range(self.backups - 1, 0, -1):
+                older = f"{self.journal_file}.{number}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.journal_file}.{number + 1}")
+            os.replace(self.journal_file, f"{self.journal_file}.1")
+            _fsync_directory(os.path.dirname(self.journal_file) or ".")
+        self.journal = open(self.journal_file, "w", encoding="utf-8")
+        self.pending_records = 0
+        self.last_compaction = time.monotonic()
+
+    def load_archived_events(self) -> list:
+        """Reads the archived (closed) events from data/archive.json."""
+        snapshot, _ = read_latest_snapshot(self.archive_file, self.backups)
+        return snapshot.get("events", [])
+
+    def archive_event(self, event: dict) -> None:
+        """Moves an event from the active snapshot to data/archive.json."""
+        archived = [e for e in self.load_archived_events() if e["id"] != event["id"]]
+        archived.append(event)
+        # The archive is written before the journal record, so a crash in between
+        # leaves the event in both places rather than in neither.
+        write_snapshot(self.archive_file, {"events": archived}, self.backups)
+        self._append("event_archived", event["id"])
+
+    def restore_event(self, event_id: int):
+        """Moves an event from data/archive.json back to the active events. Returns it, or None."""
+        archived = self.load_archived_events()
+        event = next((e for e in archived if e["id"] == event_id), None)
+        if event is None:
+            return None
+        event["show"] = True
+        self._append("event_restored", event_id, fields=event)
+        self.sync()
+        remaining = [e for e in archived if e["id"] != event_id]
+        write_snapshot(self.archive_file, {"events": remaining}, self.backups)
+        return event
+
+    def close(self) -> None:
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+
+class SqliteStorage:
+    """
+    Keeps events, attendees and waitlist entries as rows in a SQLite database
+    in WAL mode. An RSVP or cancellation is a single row insert or delete.
+    After load_events(), all methods except max_event_id() run on the
+    BackgroundWriter thread.
+    """
+
+    def __init__(self, db_file: str):
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        self.db = sqlite3.connect(db_file, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id   INTEGER PRIMARY KEY,
+                show INTEGER NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS members (
+                seq       INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id  INTEGER NOT NULL,
+                list_name TEXT NOT NULL,
+                user_id   INTEGER NOT NULL,
+                data      TEXT NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS members_by_user ON members (event_id, list_name, user_id);
+            """
+        )
+        self.db.commit()
+        self.highest_id = self.db.execute("SELECT MAX(id) FROM events").fetchone()[0] or 0
+
+    def load_events(self, show: int = 1) -> list:
+        """
+        Returns the active (show = 1) or closed (show = 0) events in ID order,
+        with their attendee and waitlist lists filled in.
+        """
+        events = []
+        for event_id, data in self.db.execute("SELECT id, data FROM events WHERE show = ? ORDER BY id", (show,)):
+            event = json.loads(data)
+            for list_name in MEMBER_LISTS:
+                rows = self.db.execute(
+                    "SELECT data FROM members WHERE event_id = ? AND list_name = ? ORDER BY seq",
+                    (event_id, list_name),
+                )
+                event[list_name] = [json.loads(row[0]) for row in rows]
+            events.append(event)
+        return events
+
+    def max_event_id(self) -> int:
+        """Returns the highest event ID ever stored, including closed events that are not loaded."""
+        return self.highest_id
+
+    def load_archived_events(self) -> list:
+        return self.load_events(show=0)
+
+    def archive_event(self, event: dict) -> None:
+        # Closed events stay in the events table with show = 0, which startup skips.
+        self.save_event(event)
+
+    def restore_event(self, event_id: int):
+        """Marks a closed event as active again. Returns it, or None."""
+        event = next((e for e in self.load_events(show=0) if e["id"] == event_id), None)
+        if event is None:
+            return None
+        event["show"] = True
+        with self.db:
+            self._write_event_row(event)
+        return event
+
+    def _write_event_row(self, event: dict) -> None:
+        data = {key: value for key, value in event.items() if key not in MEMBER_LISTS}
+        self.db.execute(
+            "INSERT OR REPLACE INTO events (id, show, data) VALUES (?, ?, ?)",
+            (event["id"], 1 if event.get("show", True) else 0, json.dumps(data, ensure_ascii=False)),
+        )
+        self.highest_id = max(self.highest_id, event["id"])
+
+    def _write_member_rows(self, event: dict) -> None:
+        self.db.execute("DELETE FROM members WHERE event_id = ?", (event["id"],))
+        for list_name in MEMBER_LISTS:
+            self.db.executemany(
+                "INSERT INTO members (event_id, list_name, user_id, data) VALUES (?, ?, ?, ?)",
+                [
+                    (event["id"], list_name, entry["user_id"], json.dumps(entry, ensure_ascii=False))
+                    for entry in event.get(list_name, [])
+                ],
+            )
+
+    def save_all(self, events: list) -> None:
+        with self.db:
+            for event in events:
+                self._write_event_row(event)
+                self._write_member_rows(event)
+        metrics.increment("persist_flushes")
+
+    def save_event(self, event: dict) -> None:
+        """Rewrites one event and its attendee and waitlist rows."""
+        with self.db:
+            self._write_event_row(event)
+            self._write_member_rows(event)
+        metrics.increment("persist_flushes")
+
+    def add_member(self, event_id: int, list_name: str, entry: dict) -> None:
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO members (event_id, list_name, user_id, data) VALUES (?, ?, ?, ?)",
+                (event_id, list_name, entry["user_id"], json.dumps(entry, ensure_ascii=False)),
+            )
+        metrics.increment("persist_flushes")
+
+    def remove_member(self, event_id: int, list_name: str, user_id: int) -> None:
+        with self.db:
+            self.db.execute(
+                "DELETE FROM members WHERE event_id = ? AND list_name = ? AND user_id = ?",
+                (event_id, list_name, user_id),
+            )
+        metrics.increment("persist_flushes")
+
+    def update_member(self, event_id: int, list_name: str, entry: dict) -> None:
+        """Updates a member's stored data (e.g. a new rsvp_message_id) without changing their place in line."""
+        with self.db:
+            self.db.execute(
+                "UPDATE members SET data = ? WHERE event_id = ? AND list_name = ? AND user_id = ?",
+                (json.dumps(entry, ensure_ascii=False), event_id, list_name, entry["user_id"]),
+            )
+        metrics.increment("persist_flushes")
+
+    def promote_member(self, event_id: int, entry: dict) -> None:
+        """Moves a user from the waitlist to the end of the attendees list."""
+        with self.db:
+            self.db.execute(
+                "DELETE FROM members WHERE event_id = ? AND list_name = 'waitlist' AND user_id = ?",
+                (event_id, entry["user_id"]),
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO members (event_id, list_name, user_id, data) VALUES (?, 'attendees', ?, ?)",
+                (event_id, entry["user_id"], json.dumps(entry, ensure_ascii=False)),
+            )
+        metrics.increment("persist_flushes")
+
+    def compaction_due(self, force: bool = False) -> bool:
+        # Every change is committed as it happens.
+        return False
+
+    def sync(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class BackgroundWriter:
+    """
+    Runs storage calls one at a time, in order, on a dedicated thread so that
+    serializing and writing data never blocks the asyncio event loop.
+    """
+
+    def __init__(self):
+        self.calls = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args) -> Future:
+        """Queues fn(*args). The returned future completes once the call has finished."""
+        future = Future()
+        self.calls.put((future, fn, args))
+        metrics.increment("persist_queued")
+        return future
+
+    def _run(self) -> None:
+        while True:
+            future, fn, args = self.calls.get()
+            if fn is None:
+                future.set_result(None)
+                return
+            started = time.perf_counter()
+            try:
+                future.set_result(fn(*args))
+            except Exception as ex:
+                print(f"[Storage] Background write failed: {ex}")
+                metrics.increment("persist_errors")
+                future.set_exception(ex)
+            metrics.observe("persist_write_time", time.perf_counter() - started)
+
+    def stop(self) -> None:
+        """Waits for every queued call to finish, then stops the thread."""
+        future = Future()
+        self.calls.put((future, None, ()))
+        self.thread.join()
+
+
+def import_json_file(json_file: str, storage: SqliteStorage) -> int:
+    """Copies every event from an existing bot_data.json into the SQLite database. Returns the number of events."""
+    events = read_snapshot(json_file).get("events", [])
+    storage.save_all(events)
+    return len(events)
@@ -1,10 +1,23 @@
+import argparse
+import asyncio
 import json
-import os
 import logging
+import signal
+import ssl
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler
 from config import config
 from event_admin import get_eventadmin_handlers
 import event_admin.data_manager
+from event_admin.data_manager import is_event_admin, start_flush_job, flush_on_shutdown, persistence_stats, load_startup_events, get_storage, archive_closed_events
+from event_admin.storage import SqliteStorage, import_json_file
+from event_admin.announcement_updates import edit_skip_rate
+from event_admin.announcement import schedule_pending_group_buttons
+from utils import metrics
+from utils.outbound import OutboundScheduler
+from utils.http_pool import PooledRequest, http2_available
+from utils.webhook import WebhookServer, post_updates
+from utils.offline import RecordingRequest
+from utils.unreachable import clear_unreachable
 from rsvp import (
     rsvp_callback,
     cancel_rsvp_callback,
@@ -22,8 +35,41 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximum number of updates handled at the same time.
+CONCURRENT_UPDATES = getattr(config, "concurrent_updates", 64)
+
+# Connections and timeouts (seconds) of the bot's HTTP client. Calls to the
+# Bot API and polling for updates use separate connection pools, so a bulk
+# message to attendees never makes getUpdates wait for a connection.
+HTTP_POOL_SIZE = getattr(config, "http_pool_size", 64)
+HTTP_UPDATES_POOL_SIZE = getattr(config, "http_updates_pool_size", 2)
+HTTP_CONNECT_TIMEOUT = getattr(config, "http_connect_timeout", 5)
+HTTP_READ_TIMEOUT = getattr(config, "http_read_timeout", 10)
+HTTP_WRITE_TIMEOUT = getattr(config, "http_write_timeout", 10)
+HTTP_POOL_TIMEOUT = getattr(config, "http_pool_timeout", 3)
+# HTTP/2 is used if enabled and the h2 package is installed.
+HTTP2 = getattr(config, "http2", True)
+
+# How updates are received: "polling" (getUpdates) or "webhook" (Telegram
+# pushes them to the built-in HTTP server, see utils/webhook.py).
+UPDATE_MODE = getattr(config, "update_mode", "polling")
+WEBHOOK_LISTEN = getattr(config, "webhook_listen", "127.0.0.1")
+WEBHOOK_PORT = getattr(config, "webhook_port", 8443)
+WEBHOOK_PATH = getattr(config, "webhook_path", "/telegram")
+WEBHOOK_SECRET_TOKEN = getattr(config, "webhook_secret_token", None)
+# Public HTTPS URL Telegram should send updates to, e.g. the reverse proxy in
+# front of the server. Without it no webhook is registered with Telegram.
+WEBHOOK_URL = getattr(config, "webhook_url", None)
+# Certificate and key to serve HTTPS directly instead of behind a proxy.
+WEBHOOK_CERT = getattr(config, "webhook_cert", None)
+WEBHOOK_KEY = getattr(config, "webhook_key", None)
+# Updates received but not yet being handled before the server answers 503.
+WEBHOOK_QUEUE_SIZE = getattr(config, "webhook_queue_size", 100)
+
 async def start_command(update, context):
     """Respond to /start command with a friendly greeting."""
+    # The user has a private chat with the bot now, so RSVP confirmations can reach them
+    clear_unreachable(update.effective_user.id)
     await update.message.reply_text("Hello! I am the Victoria Pups Bot. How can I help you today?")
 
 async def help_command(update, context):
@@ -74,28 +120,161 @@ async def debug_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Reply with a simple acknowledgment
     await update.message.reply_text("Debug info printed to terminal.")
 
-def main():
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the bot's performance counters to event admins."""
+    if not is_event_admin(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to use this command.")
+        return
+
+    depths = context.bot.rate_limiter.queue_depths()
+    queue_text = ", ".join(f"{lane}={depth}" for lane, depth in depths.items())
+    webhook_server = context.bot_data.get("webhook_server")
+    pools = "\n".join(request.utilization() for request in context.bot_data.get("http_pools", []))
+    if webhook_server is not None:
+        queue_text += f"\nWebhook queue: {webhook_server.queue_depth()}/{WEBHOOK_QUEUE_SIZE}"
+    text = (
+        f"{persistence_stats()}\n"
+        f"Announcement edits skipped as unchanged: {edit_skip_rate():.0%}\n"
+        f"Outbound queue: {queue_text}\n"
+        f"HTTP connections:\n{pools}\n\n"
+        f"{metrics.report()}"
+    )
+    await update.message.reply_text(text)
+
+def import_json(json_file: str):
+    """Copy the events of an existing bot_data.json into the SQLite database."""
+    storage = get_storage()
+    if not isinstance(storage, SqliteStorage):
+        print("Set storage_backend = \"sqlite\" in config.py before importing.")
+        return
+    count = import_json_file(json_file, storage)
+    storage.close()
+    print(f"Imported {count} events from {json_file}.")
+
+def archive_closed():
+    """Move closed events that are still stored with the active ones into the archive."""
+    count = archive_closed_events()
+    print(f"Archived {count} closed events.")
+
+def post_recorded_updates(files: list):
+    """POST updates saved as JSON files (one update or a list of them) to the local webhook server."""
+    updates = []
+    for file in files:
+        with open(file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        updates.extend(data if isinstance(data, list) else [data])
+    host = "127.0.0.1" if WEBHOOK_LISTEN in ("0.0.0.0", "") else WEBHOOK_LISTEN
+    scheme = "https" if WEBHOOK_CERT else "http"
+    statuses = post_updates(f"{scheme}://{host}:{WEBHOOK_PORT}{WEBHOOK_PATH}", updates, WEBHOOK_SECRET_TOKEN)
+    for update, status in zip(updates, statuses):
+        print(f"Update {update.get('update_id')}: HTTP {status}")
+
+async def run_webhook(app: Application, offline: bool = False):
+    """
+    Run the bot with updates pushed to the built-in webhook server until
+    interrupted. In offline mode no webhook is registered with Telegram.
+    """
+    ssl_context = None
+    if WEBHOOK_CERT:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(WEBHOOK_CERT, WEBHOOK_KEY)
+    server = WebhookServer(
+        app,
+        WEBHOOK_LISTEN,
+        WEBHOOK_PORT,
+        WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET_TOKEN,
+        queue_size=WEBHOOK_QUEUE_SIZE,
+        workers=CONCURRENT_UPDATES,
+        ssl_context=ssl_context,
+    )
+    app.bot_data["webhook_server"] = server
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    app_started = False
+    server_started = False
+    try:
+        await app.initialize()
+        try:
+            await app.start()
+            app_started = True
+            await server.start()
+            server_started = True
+            if WEBHOOK_URL and not offline:
+                await app.bot.set_webhook(WEBHOOK_URL, secret_token=WEBHOOK_SECRET_TOKEN, allowed_updates=Update.ALL_TYPES)
+            await stop.wait()
+        finally:
+            if server_started:
+                await server.stop()
+            if app_started:
+                await app.stop()
+            await app.shutdown()
+            if app.post_shutdown:
+                await app.post_shutdown(app)
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+
+def build_request(name: str, pool_size: int) -> PooledRequest:
+    return PooledRequest(
+        name,
+        pool_size,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        write_timeout=HTTP_WRITE_TIMEOUT,
+        pool_timeout=HTTP_POOL_TIMEOUT,
+        http_version="2" if HTTP2 and http2_available() else "1.1",
+    )
+
+def offline_bot_user(token: str) -> dict:
+    """The bot's own user, as getMe would return it, for offline mode."""
+    bot_id = token.split(":", 1)[0]
+    return {
+        "id": int(bot_id) if bot_id.isdigit() else 1,
+        "is_bot": True,
+        "first_name": "Victoria Pups Bot",
+        "username": getattr(config, "bot_username", "offline_bot"),
+    }
+
+def main(offline: bool = False):
+    """
+    Run the bot. With `offline` it runs in webhook mode without contacting
+    Telegram: Bot API calls are only printed (see utils/offline.py), so
+    recorded updates can be POSTed to it with --post-updates.
+    """
     # Initialize the application
     token = config.token
-    app = Application.builder().token(token).build()
-
-    # Ensure data directory and file exists
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    # Move up one level to get the project root directory
-    project_root = os.path.dirname(script_dir)
-    data_dir = os.path.join(project_root, "data")
-    os.makedirs(data_dir, exist_ok=True)
-    
-    data_file = os.path.join(data_dir, "bot_data.json")
-
-    if not os.path.exists(data_file):
-        # Create empty data file
-        with open(data_file, 'w', encoding='utf-8') as f:
-            json.dump({"events": []}, f, ensure_ascii=False, indent=4)
+    # Updates are handled concurrently; changes to the same event are still
+    # applied one at a time by the event's queue (event_admin/actors.py).
+    if offline:
+        api_request = RecordingRequest(offline_bot_user(token))
+    else:
+        api_request = build_request("api", HTTP_POOL_SIZE)
+    http_pools = [api_request]
+    builder = (
+        Application.builder()
+        .token(token)
+        .request(api_request)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .rate_limiter(OutboundScheduler())
+        .post_shutdown(flush_on_shutdown)
+    )
+    if UPDATE_MODE == "webhook" or offline:
+        # Updates come from the webhook server, not from getUpdates
+        builder = builder.updater(None)
+    else:
+        updates_request = build_request("updates", HTTP_UPDATES_POOL_SIZE)
+        http_pools.append(updates_request)
+        builder = builder.get_updates_request(updates_request)
+    app = builder.build()
+    app.bot_data["http_pools"] = http_pools
 
-    # Load data into bot_data
-    with open(data_file, 'r', encoding='utf-8') as f:
-        app.bot_data = json.load(f)  # e.g. {"events": [...]}
+    # Load the events into bot_data, e.g. {"events": [...]}
+    app.bot_data["events"] = load_startup_events()
 
     # Add eventadmin handlers (the conversation handler)
     app.add_handler(get_eventadmin_handlers())
@@ -108,9 +287,35 @@ def main():
     app.add_handler(CallbackQueryHandler(keep_waitlist_callback, pattern=r"^keepwaitlist:\d+$"))
     app.add_handler(CallbackQueryHandler(cancel_waitlist_callback, pattern=r"^cancelwaitlist:\d+$"))
     
+    app.add_handler(CommandHandler("start", start_command))
     app.add_handler(CommandHandler("debug", debug_command))
-    # Start polling after all handlers are registered
-    app.run_polling()
+    app.add_handler(CommandHandler("stats", stats_command))
+
+    # Write changes to bot_data to disk in batches
+    start_flush_job(app)
+
+    # Group RSVP buttons that were waiting to be posted when the bot stopped
+    schedule_pending_group_buttons(app)
+
+    # Start receiving updates after all handlers are registered
+    if UPDATE_MODE == "webhook" or offline:
+        asyncio.run(run_webhook(app, offline))
+    else:
+        app.run_polling()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Victoria Pups event bot")
+    parser.add_argument("--import-json", metavar="FILE", help="import an existing bot_data.json into the SQLite database and exit")
+    parser.add_argument("--archive-closed", action="store_true", help="move closed events into the archive and exit")
+    parser.add_argument("--offline", action="store_true", help="run the webhook server without contacting Telegram, printing the Bot API calls instead of sending them")
+    parser.add_argument("--post-updates", metavar="FILE", nargs="+", help="POST recorded update JSON files to the running bot's local webhook server and exit")
+    args = parser.parse_args()
+
+    if args.import_json:
+        import_json(args.import_json)
+    elif args.archive_closed:
+        archive_closed()
+    elif args.post_updates:
+        post_recorded_updates(args.post_updates)
+    else:
+        main(offline=args.offline)
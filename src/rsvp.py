@@ -1,19 +1,67 @@
 import re
+import functools
 from datetime import date, time, datetime
+from time import perf_counter
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 
-from event_admin.data_manager import update_event_attendees, save_events
+from event_admin.data_manager import get_event, save_rsvp_added, save_rsvp_removed, save_rsvp_updated, save_rsvp_promoted
 from event_admin import rsvp_admin
+from event_admin.members import find_member, add_member, remove_member
+from event_admin.actors import serial_per_event, run_serially
+from event_admin.announcement_updates import schedule_announcement_update
+from event_admin.render_cache import cached_render
+from utils import metrics
+from utils.markdown import escape_value, escape_link_url
+from utils.unreachable import is_unreachable, note_send_error
+
+# The RSVP callback handlers below only decide and record the change to the
+# event, then return what the user should be told: None, or (text, show_alert).
+# answers_callback answers the callback query exactly once with that, and all
+# DMs and message edits are done afterwards by background tasks.
+
+CALLBACK_ERROR_TEXT = "Something went wrong, please try again."
+
+def answers_callback(handler):
+    """Answer the handler's callback query once, with the answer it returns, and time it."""
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        received = perf_counter()
+        # If the handler raises, the user is still answered (so their button
+        # stops spinning) and the exception goes on to the error handler.
+        answer = (CALLBACK_ERROR_TEXT, False)
+        try:
+            answer = await handler(update, context)
+        finally:
+            text, show_alert = answer or (None, False)
+            try:
+                await update.callback_query.answer(text, show_alert=show_alert)
+            except Exception as ex:
+                print(f"[RSVP] Could not answer callback query: {ex}")
+            metrics.observe("rsvp_answer_latency", perf_counter() - received)
+    return wrapper
+
+def in_background(context: ContextTypes.DEFAULT_TYPE, coroutine):
+    """Run a coroutine after the handler has returned (and the callback is answered)."""
+    return context.application.create_task(coroutine)
+
+async def edit_pressed_message(query, text: str, keyboard: InlineKeyboardMarkup = None):
+    """Edit the private message whose button the user pressed."""
+    try:
+        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=keyboard, disable_web_page_preview=True)
+    except Exception as ex:
+        print(f"Could not edit user's private message: {ex}")
 
+@answers_callback
+@serial_per_event
 async def rsvp_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     If user presses "RSVP" in the channel, we:
-    
+    - re-send their confirmation if they are already attending or on the waitlist,
+    - otherwise reserve a seat, or a waitlist spot if the event is full.
     """
     query = update.callback_query
-    await query.answer()
 
     # parse event ID
     match = re.match(r"^rsvp:(\d+)$", query.data)
@@ -25,11 +73,9 @@ async def rsvp_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = user.id
 
     # find the event
-    events = context.bot_data.get("events", [])
-    event_data = next((ev for ev in events if ev["id"] == event_id), None)
+    event_data = get_event(context, event_id)
     if not event_data:
-        await query.answer("Event not found.", show_alert=False)
-        return
+        return "Event not found.", False
 
     # ensure data structures
     if "attendees" not in event_data:
@@ -38,22 +84,27 @@ async def rsvp_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         event_data["waitlist"] = []
 
     # see if user is already in event
-    in_attendees = next((a for a in event_data["attendees"] if a["user_id"] == user_id), None)
-    in_waitlist = next((w for w in event_data["waitlist"] if w["user_id"] == user_id), None)
+    list_name, entry = find_member(event_data, user_id)
     
-    print(in_attendees)
-    if in_attendees:
-        await resend_rsvp_message(update, context, event_data, user_id, event_id, in_attendees["rsvp_message_id"])
-    elif in_waitlist:
-        await resend_waitlist_message(update, context, event_data, user_id, event_id, in_waitlist["rsvp_message_id"])
+    if list_name == "attendees":
+        return resend_rsvp_message(update, context, event_data, user_id, event_id, entry["rsvp_message_id"])
+    elif list_name == "waitlist":
+        return resend_waitlist_message(update, context, event_data, user_id, event_id, entry["rsvp_message_id"])
+    elif is_unreachable(user_id):
+        # Their confirmation failed recently; don't hold a seat for a DM that can't arrive
+        metrics.increment("rsvp_unreachable_refused")
+        return "Please start a private chat with the bot (send it /start) first, then press RSVP again.", True
     elif not event_data.get("has_capacity", False) or len(event_data["attendees"]) < event_data["capacity"]:
-        await add_to_attendee(update, context, event_data, user_id, event_id)
+        return await add_to_attendee(update, context, event_data, user_id, event_id)
     else:
-        await add_to_waitlist(update, context, event_data, user_id, event_id)
+        return await add_to_waitlist(update, context, event_data, user_id, event_id)
 
 def rsvp_header_text(event_data: dict):
-    """Generate the header text for the RSVP message."""
-    text = f"__*{event_data['name']}*__\n"
+    """Generate the header text for the RSVP message. It is rendered once per version of the event."""
+    return cached_render(event_data, "header", render_rsvp_header)
+
+def render_rsvp_header(event_data: dict):
+    text = f"__*{escape_value(event_data['name'])}*__\n"
     if event_data['date'] != 'None':
         event_date = date.fromisoformat(event_data['date'])
         text += f"_Date: {event_date.strftime('%A, %B %d, %Y')}_\n"
@@ -66,235 +117,211 @@ def rsvp_header_text(event_data: dict):
     if event_data['start_time'] != 'None' and event_data['end_time'] != 'None':
         start_time = datetime.strptime(event_data['start_time'], '%H:%M')
         end_time = datetime.strptime(event_data['end_time'], '%H:%M')
-        text += f"_Time: {start_time.strftime('%I:%M %p')} \- {end_time.strftime('%I:%M %p')}_\n"
+        time_range = f"{start_time.strftime('%I:%M %p')} - {end_time.strftime('%I:%M %p')}"
+        text += f"_Time: {escape_value(time_range)}_\n"
     if event_data['location'] != 'None':
         # Add event_data['location_link'] if it exists
-        if event_data['location_link'] != 'None':
-            text += f"_Location: [{event_data['location']}]({event_data['location_link']})_\n"
+        location = escape_value(event_data['location'])
+        if event_data['location_link'] not in (None, 'None'):
+            text += f"_Location: [{location}]({escape_link_url(event_data['location_link'])})_\n"
         else:
-            text += f"_Location: {event_data['location']}_\n"
+            text += f"_Location: {location}_\n"
     # text += "\n"
     
     return text
 
-async def resend_rsvp_message(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, event_id: int, rsvp_message_id: int):
+def resend_rsvp_message(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, event_id: int, rsvp_message_id: int):
     """Re-send the RSVP message to the user."""
-    query = update.callback_query
-    await query.answer()
-
+    text = (
+        f"✅  {rsvp_header_text(event_data)}\n"
+        + escape_value("You have already RSVP'd to this event. Press 'Cancel RSVP' if you can no longer attend.")
+    )
+    cancel_rsvp_kb = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel RSVP", callback_data=f"cancelrsvp:{event_id}")]
+        ])
+    old_text = (
+        f"{rsvp_header_text(event_data)}\n"
+        + escape_value("RSVP confirmation message re-sent.")
+    )
+    in_background(context, resend_confirmation(context, event_data, user_id, "attendees", text, cancel_rsvp_kb, rsvp_message_id, old_text))
+    return f"RSVP confirmation for {event_data['name']} re-sent!", True
+    
+async def add_to_attendee(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, event_id: int):
+    """Reserve a seat for the user, then send the confirmation DM in the background."""
+    text = (
+        f"✅  {rsvp_header_text(event_data)}\n"
+        + escape_value("You have successfully RSVP'd to this event. Press 'Cancel RSVP' if you can no longer attend.")
+    )
+    cancel_rsvp_kb = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel RSVP", callback_data=f"cancelrsvp:{event_id}")]
+    ])
+    await reserve_spot(update, context, event_data, "attendees", text, cancel_rsvp_kb)
+    return "You're RSVP'd! Your confirmation is on its way in your private chat with the bot. If it doesn't arrive, start a chat with the bot and press RSVP again.", True
     
-    # re-send RSVP confirmation DM
+def resend_waitlist_message(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, event_id: int, rsvp_message_id: int):
+    """Re-send the waitlist message to the user."""
+    text = (
+        f"✅  {rsvp_header_text(event_data)}\n"
+        + escape_value("You are already on the waitlist to this event. Press 'Cancel RSVP' if you no longer wish to attend.")
+    )
+    cancel_rsvp_kb = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel Waitlist", callback_data=f"cancelwaitlist:{event_id}")]
+    ])
+    old_text = (
+        f"{rsvp_header_text(event_data)}\n"
+        + escape_value("Resent waitlist confirmation message.")
+    )
+    in_background(context, resend_confirmation(context, event_data, user_id, "waitlist", text, cancel_rsvp_kb, rsvp_message_id, old_text))
+    return "Waitlist confirmation re-sent!", True
+
+async def resend_confirmation(context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, list_name: str, text: str, keyboard: InlineKeyboardMarkup, old_message_id: int, old_text: str):
+    """Background part of pressing RSVP again: send a new confirmation DM and retire the old one."""
     try:
-        text = (
-            f"✅  {rsvp_header_text(event_data)}\n"
-            f"You have already RSVP'd to this event\. Press 'Cancel RSVP' if you can no longer attend\."
-        )
-        cancel_rsvp_kb = InlineKeyboardMarkup([
-            [InlineKeyboardButton("Cancel RSVP", callback_data=f"cancelrsvp:{event_id}")]
-            ])
         dm_message = await context.bot.send_message(
             chat_id=user_id,
             text=text,
             parse_mode=ParseMode.MARKDOWN_V2,
-            reply_markup=cancel_rsvp_kb,
+            reply_markup=keyboard,
             disable_web_page_preview=True
         )
-        
-        # Send an ephemeral message to the channel
-        await query.answer(f"RSVP confirmation for {event_data['name']} re-sent!", show_alert=True)
-        
-        # Incase the user has deleted the earlier confirmation message, we use a try-except block
+    except Exception as ex:
+        note_send_error(user_id, ex)
+        print(f"[RSVP] Could not re-send confirmation to user {user_id}: {ex}")
+        return
+    
+    # Incase the user has deleted the earlier confirmation message, we use a try-except block
+    if old_message_id:
         try:
-            text = (
-                f"{rsvp_header_text(event_data)}\n"
-                "RSVP confirmation message re\-sent\."
-            )
             await context.bot.edit_message_text(
                 chat_id=user_id,
-                message_id=rsvp_message_id,
-                text=text,
-                parse_mode=ParseMode.MARKDOWN_V2
+                message_id=old_message_id,
+                text=old_text,
+                parse_mode=ParseMode.MARKDOWN_V2,
+                disable_web_page_preview=True
             )
         except Exception as ex:
             print(f"Could not edit user's private message: {ex}")
-        
-        for idx, attendee in enumerate(event_data["attendees"]):
-            if attendee["user_id"] == user_id:
-                event_data["attendees"][idx]["rsvp_message_id"] = dm_message.message_id
-                break
-        
-        await update_announcement_message(update, context, event_data)
-        update_event_attendees(event_id, event_data, context)
-        
-    except Exception as ex:
-        print(f"Error in resend_rsvp_message: {ex}")
-        await query.answer("Please message the bot in private first.", show_alert=False)
-        return
     
+    await run_serially(event_data["id"], record_confirmation, context, event_data, user_id, list_name, dm_message.message_id)
     
-async def add_to_attendee(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, event_id: int):
-    """Add the user to the attendees list."""
-    query = update.callback_query
-    await query.answer()
+async def add_to_waitlist(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, event_id: int):
+    """Reserve a waitlist spot for the user, then send the confirmation DM in the background."""
+    text = (
+        f"✅  {rsvp_header_text(event_data)}\n"
+        + escape_value("You have successfully joined the waitlist to this event. Press 'Cancel RSVP' if you can no longer attend.")
+    )
+    cancel_rsvp_kb = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel Waitlist", callback_data=f"cancelwaitlist:{event_id}")]
+    ])
+    await reserve_spot(update, context, event_data, "waitlist", text, cancel_rsvp_kb)
+    return "The event is full, you're on the waitlist! Your confirmation is on its way in your private chat with the bot. If it doesn't arrive, start a chat with the bot and press RSVP again.", True
+
+async def reserve_spot(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, list_name: str, text: str, keyboard: InlineKeyboardMarkup):
+    """
+    Phase one of an RSVP: record the user on the list straight away, in memory
+    and in the journal, so the capacity decision never waits on Telegram.
+    The confirmation DM (confirm_spot) and the announcement edit run afterwards
+    as background tasks.
+    """
+    user = update.callback_query.from_user  # The user who pressed "RSVP"
+    entry = {
+            "user_id": user.id,
+            "username": user.username,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "rsvp_message_id": None  # set once the DM has been sent
+        }
+    add_member(event_data, list_name, entry)
+    save_rsvp_added(context, event_data["id"], list_name, entry)
+    metrics.increment("rsvp_reserved")
     
-    # re-send RSVP confirmation DM
+    in_background(context, confirm_spot(update, context, event_data, user.id, list_name, text, keyboard))
+    await update_announcement_message(update, context, event_data)
+
+async def confirm_spot(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, list_name: str, text: str, keyboard: InlineKeyboardMarkup, old_message_id: int = None):
+    """
+    Phase two of an RSVP or a promotion: send the confirmation DM. If the bot
+    is not allowed to message the user (they never started a chat with it, or
+    blocked it) the spot is released again and the user is remembered as
+    unreachable; any other error keeps the spot.
+    """
     try:
-        text = (
-            f"✅  {rsvp_header_text(event_data)}\n"
-            f"You have successfully RSVP'd to this event\. Press 'Cancel RSVP' if you can no longer attend\."
-        )
-        cancel_rsvp_kb = InlineKeyboardMarkup([
-            [InlineKeyboardButton("Cancel RSVP", callback_data=f"cancelrsvp:{event_id}")]
-        ])
         dm_message = await context.bot.send_message(
             chat_id=user_id,
             text=text,
             parse_mode=ParseMode.MARKDOWN_V2,
-            reply_markup=cancel_rsvp_kb,
+            reply_markup=keyboard,
             disable_web_page_preview=True
         )
-        
-        # Send an ephemeral message to the channel
-        await query.answer("RSVP confirmation sent!", show_alert=True)
-        
-        user = query.from_user  # The user who pressed "RSVP"
-        
-        event_data["attendees"].append({
-                "user_id": user_id,
-                "username": user.username,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "rsvp_message_id": dm_message.message_id  # store the DM message ID
-            })
-        
-        update_event_attendees(event_id, event_data, context)
-        
-        await update_announcement_message(update, context, event_data)
-        
     except Exception as ex:
-        print(f"Error in add_to_attendee: {ex}")
-        await query.answer("Please message the bot in private first.", show_alert=False)
+        if note_send_error(user_id, ex):
+            print(f"[RSVP] Could not message user {user_id}, releasing their spot: {ex}")
+            await run_serially(event_data["id"], release_spot, update, context, event_data, user_id, list_name)
+        else:
+            print(f"[RSVP] Could not send RSVP confirmation to user {user_id}: {ex}")
         return
     
-async def resend_waitlist_message(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, event_id: int, rsvp_message_id: int):
-    """Re-send the RSVP message to the user."""
-    query = update.callback_query
-    await query.answer()
-    
-    # re-send RSVP confirmation DM
-    try:
-        text = (
-            f"✅  {rsvp_header_text(event_data)}\n"
-            f"You are already on the waitlist to this event\. Press 'Cancel RSVP' if you no longer wish to attend\."
-        )
-        cancel_rsvp_kb = InlineKeyboardMarkup([
-            [InlineKeyboardButton("Cancel Waitlist", callback_data=f"cancelwaitlist:{event_id}")]
-        ])
-        dm_message = await context.bot.send_message(
-            chat_id=user_id,
-            text=text,
-            parse_mode=ParseMode.MARKDOWN_V2,
-            reply_markup=cancel_rsvp_kb,
-            disable_web_page_preview=True
-        )
-        
-        # Send an ephemeral message to the channel
-        await query.answer("Waitlist confirmation re\-sent!", show_alert=True)
-        
-        # Incase the user has deleted the earlier confirmation message, we use a try-except block
+    # Edit their old message (e.g. the waitlist confirmation of a promoted user)
+    if old_message_id:
         try:
-            text = (
-                f"{rsvp_header_text(event_data)}\n"
-                f"Resent waitlist confirmation message\."
-            )
-            dm_message = await context.bot.edit_message_text(
+            await context.bot.edit_message_text(
                 chat_id=user_id,
-                message_id=rsvp_message_id,
+                message_id=old_message_id,
                 text=text,
                 parse_mode=ParseMode.MARKDOWN_V2,
                 disable_web_page_preview=True
             )
         except Exception as ex:
-            print(f"Could not edit user's private message: {ex}")
-            # Update the in-memory events list
-            
-        for idx, attendee in enumerate(event_data["waitlist"]):
-            if attendee["user_id"] == user_id:
-                event_data["waitlist"][idx]["rsvp_message_id"] = dm_message.message_id
-                break
-            
-        
-        update_event_attendees(event_id, event_data, context)
-        await update_announcement_message(update, context, event_data)
-        
-    except Exception as ex:
-        print(f"Error in resend_rsvp_message: {ex}")
-        await query.answer("Please message the bot in private first.", show_alert=False)
-        return
-    
-async def add_to_waitlist(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, event_id: int):
-    """Add the user to the waitlist."""
-    query = update.callback_query
-    await query.answer()
+            print(f"[RSVP] Could not edit user's old private message: {ex}")
     
-    # re-send RSVP confirmation DM
-    try:
-        text = (
-            f"✅  {rsvp_header_text(event_data)}\n"
-            f"You have successfully joined the waitlist to this event\. Press 'Cancel RSVP' if you can no longer attend\."
-        )
-        cancel_rsvp_kb = InlineKeyboardMarkup([
-            [InlineKeyboardButton("Cancel Waitlist", callback_data=f"cancelwaitlist:{event_id}")]
-        ])
-        dm_message = await context.bot.send_message(
-            chat_id=user_id,
-            text=text,
-            parse_mode=ParseMode.MARKDOWN_V2,
-            reply_markup=cancel_rsvp_kb,
-            disable_web_page_preview=True
-        )
-        
-        # Send an ephemeral message to the channel
-        await query.answer("Waitlist confirmation sent!", show_alert=True)
-        
-        user = query.from_user  # The user who pressed "RSVP"
-        
-        event_data["waitlist"].append({
-                "user_id": user_id,
-                "username": user.username,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "rsvp_message_id": dm_message.message_id  # store the DM message ID
-            })
-        
-        update_event_attendees(event_id, event_data, context)
-        
-        await update_announcement_message(update, context, event_data)
-        
-    except Exception as ex:
-        print(f"Error in add_to_attendee: {ex}")
-        await query.answer("Please message the bot in private first.", show_alert=False)
+    await run_serially(event_data["id"], record_confirmation, context, event_data, user_id, list_name, dm_message.message_id)
+
+async def record_confirmation(context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, list_name: str, message_id: int):
+    """
+    Store the confirmation DM's message ID on the user's entry, if they are
+    still on the list the DM was sent for. A waitlist confirmation that
+    arrives after the user was promoted must not replace the promotion's DM.
+    """
+    current_list, entry = find_member(event_data, user_id)
+    if current_list != list_name:
         return
+    entry["rsvp_message_id"] = message_id
+    save_rsvp_updated(context, event_data["id"], current_list, entry)
 
+async def release_spot(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict, user_id: int, list_name: str):
+    """Roll back a reservation or promotion whose confirmation DM could not be delivered."""
+    current_list, _ = find_member(event_data, user_id)
+    if current_list != list_name:
+        return
+    remove_member(event_data, user_id)
+    save_rsvp_removed(context, event_data["id"], list_name, user_id)
+    metrics.increment("rsvp_rolled_back")
+    if list_name == "attendees":
+        # The seat is free again
+        await promote_from_waitlist(update, context, event_data)
+    else:
+        await update_announcement_message(update, context, event_data)
+
+@answers_callback
+@serial_per_event
 async def cancel_rsvp_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Asks to make sure the user is sure they want to cancel their RSVP. Warns them if they won't be able to re-join if the event is full."""
     query = update.callback_query
-    await query.answer()  # Acknowledge the callback (removes Telegram's loading spinner)
 
     # 1. Parse event ID from callback data
     match = re.match(r"^cancelrsvp:(\d+)$", query.data)
     if not match:
         # Invalid callback_data
-        await query.answer("Invalid callback data", show_alert=False)
-        return
+        return "Invalid callback data", False
 
     event_id = int(match.group(1))
     user = query.from_user
     user_id = user.id
     
     # find the event
-    events = context.bot_data.get("events", [])
-    event_data = next((ev for ev in events if ev["id"] == event_id), None)
+    event_data = get_event(context, event_id)
+    if not event_data:
+        return "Event not found.", True
     
     # Check if there will be space in the event after the user cancels.
     has_capacity = event_data.get("has_capacity", False)
@@ -303,13 +330,15 @@ async def cancel_rsvp_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     if has_capacity and non_empty_waitlist:
         text = (
             f"⚠️  {rsvp_header_text(event_data)}\n"
-            "The event is at capacity and there are pups on the waitlist, if you cancel your RSVP and change your mind, you will be added to the waitlist\.\n"
-            "Are you sure you want to cancel your RSVP\?"
+            + escape_value(
+                "The event is at capacity and there are pups on the waitlist, if you cancel your RSVP and change your mind, you will be added to the waitlist.\n"
+                "Are you sure you want to cancel your RSVP?"
+            )
         )
     else:
         text = (
             f"⚠️  {rsvp_header_text(event_data)}\n"
-            "Are you sure you want to cancel your RSVP\?"
+            + escape_value("Are you sure you want to cancel your RSVP?")
         )        
     
     buttons = [
@@ -319,139 +348,102 @@ async def cancel_rsvp_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     keyboard = InlineKeyboardMarkup(buttons)
     
     # Store the message that is currently displayed to the user in the user data to return the message to its previous state if they decide to keep their RSVP.
-    for idx, attendee in enumerate(event_data["attendees"]):
-        if attendee["user_id"] == user_id:
-            attendee["rsvp_message_text"] = query.message.text_markdown_v2
-            # attendee["rsvp_message_keyboard"] = query.message.reply_markup
-            break
-    
-    update_event_attendees(event_id, event_data, context)
-    
-    await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=keyboard, disable_web_page_preview=True)
+    list_name, attendee = find_member(event_data, user_id)
+    if list_name == "attendees":
+        attendee["rsvp_message_text"] = query.message.text_markdown_v2
+        # attendee["rsvp_message_keyboard"] = query.message.reply_markup
+        save_rsvp_updated(context, event_id, "attendees", attendee)
     
+    in_background(context, edit_pressed_message(query, text, keyboard))
     return
     
+@answers_callback
+@serial_per_event
 async def keep_rsvp_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Puts the original RSVP message back to what it was before the user tried to cancel their RSVP."""
     query = update.callback_query
-    await query.answer()  # Acknowledge the callback (removes Telegram's loading spinner)
 
     # 1. Parse event ID from callback data
     match = re.match(r"^keeprsvp:(\d+)$", query.data)
     if not match:
         # Invalid callback_data
-        await query.answer("Invalid callback data", show_alert=False)
-        return
+        return "Invalid callback data", False
 
     event_id = int(match.group(1))
     user = query.from_user
     user_id = user.id
     
     # find the event
-    events = context.bot_data.get("events", [])
-    event_data = next((ev for ev in events if ev["id"] == event_id), None)
+    event_data = get_event(context, event_id)
     if not event_data:
-        await query.answer("Event not found.", show_alert=True)
-        return
+        return "Event not found.", True
     
     # Restore the original message
     old_text = None
-    for idx, attendee in enumerate(event_data["attendees"]):
-        if attendee["user_id"] == user_id:
-            old_text = attendee["rsvp_message_text"]
-            break
+    list_name, attendee = find_member(event_data, user_id)
+    if list_name == "attendees":
+        old_text = attendee.get("rsvp_message_text")
     button = [InlineKeyboardButton("Cancel RSVP", callback_data=f"cancelrsvp:{event_id}")]
     keyboard = InlineKeyboardMarkup([button])
-    await query.edit_message_text(old_text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=keyboard, disable_web_page_preview=True)
+    in_background(context, edit_pressed_message(query, old_text or f"{rsvp_header_text(event_data)}\n{escape_value('Kept your RSVP.')}", keyboard))
     
     return
 
+@answers_callback
+@serial_per_event
 async def confirm_cancel_rsvp_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle 'cancelrsvp:<event_id>' callbacks from the user's private RSVP confirmation."""
     query = update.callback_query
-    await query.answer()  # Acknowledge the callback (removes Telegram's loading spinner)
 
     # 1. Parse event ID from callback data
     match = re.match(r"^confirmcancelrsvp:(\d+)$", query.data)
     if not match:
         # Invalid callback_data
-        await query.answer("Invalid callback data", show_alert=False)
-        return
+        return "Invalid callback data", False
 
     event_id = int(match.group(1))
     user = query.from_user
     user_id = user.id
 
     # 2. Retrieve the event from bot_data
-    events = context.bot_data.get("events", [])
-    event_data = next((ev for ev in events if ev["id"] == event_id), None)
+    event_data = get_event(context, event_id)
     if not event_data:
         # Event not found
-        await query.answer("Event not found.", show_alert=False)
-        return
-
-    attendees = event_data.get("attendees", [])
-    waitlist = event_data.get("waitlist", [])
-    was_in_attendees = False
-    was_in_waitlist = False
+        return "Event not found.", False
 
     # 3. Remove user from the attendees or waitlist
-    #    If they are in multiple places (shouldn’t happen unless logic error), remove from both.
-    new_attendees = []
-    for a in attendees:
-        if a["user_id"] == user_id:
-            was_in_attendees = True
-            continue  # skip adding them
-        new_attendees.append(a)
-
-    new_waitlist = []
-    for w in waitlist:
-        if w["user_id"] == user_id:
-            was_in_waitlist = True
-            continue
-        new_waitlist.append(w)
-
-    event_data["attendees"] = new_attendees
-    event_data["waitlist"] = new_waitlist
-
-    await update_announcement_message(update, context, event_data)
+    removed_from = remove_member(event_data, user_id)
     
-    if not (was_in_attendees or was_in_waitlist):
-        # user wasn't in the event => ephemeral message
-        await query.edit_message_text(text = f"{rsvp_header_text(event_data)}\n You have no RSVP to cancel\.", parse_mode=ParseMode.MARKDOWN_V2,disable_web_page_preview=True)
+    if removed_from is None:
+        # user wasn't in the event
+        in_background(context, edit_pressed_message(query, f"{rsvp_header_text(event_data)}\n{escape_value(' You have no RSVP to cancel.')}"))
         return
     
-    # 4. Update the event data in the JSON
-    update_event_attendees(event_id, event_data, context)
+    # 4. Save the removal
+    save_rsvp_removed(context, event_id, removed_from, user_id)
     
+    # 5. Fill the free seat from the waitlist. This also re-renders the posted
+    #    announcement to reflect the new attendee count, waitlist, etc.
     await promote_from_waitlist(update, context, event_data)
 
-    # 6. Edit the posted announcement to reflect the new attendee count, waitlist, etc.
-    #    We can call the same function that `rsvp_callback` uses to re-generate the text and edit the message:
-
-
+    # 6. Edit the user's own confirmation message
+    text = (
+        f"❌  {rsvp_header_text(event_data)}\n"
+        + escape_value("You are no longer RSVP'd to this event. ")
+    )
+    in_background(context, edit_pressed_message(query, text))
+    
     # 7. Show ephemeral success in the user’s chat
-    #    If the user is in a private chat with the bot, we might want to edit their "Are you sure?" message.
-    #    But typically "answerCallbackQuery" is enough:
-    await query.answer("Your RSVP has been canceled.", show_alert=False)
-
-    # optionally, if we want to edit the user’s own confirmation message:
-    try:
-        text = (
-            f"❌  {rsvp_header_text(event_data)}\n"
-            f"You are no longer RSVP'd to this event\. "
-        )
-        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, disable_web_page_preview=True)
-    except Exception as ex:
-        print(f"Could not edit user’s private message: {ex}")
+    return "Your RSVP has been canceled.", False
 
 async def promote_from_waitlist(update: Update, context: ContextTypes.DEFAULT_TYPE, event_data: dict):
     """
     Attempt to promote from the waitlist for the given event_data.
     If there's capacity and there's a waitlist, move first from waitlist -> attendees.
+    Users the bot can't message at the moment keep their place but are passed over.
+    The promotion is recorded right away; the DM telling the user is sent in
+    the background and the seat is passed on if it cannot be delivered.
     """
-    print("promote_from_waitlist called")
-    
     """We want to handle the possibility that the capacity of the event no longer exists."""
     # # If there's no capacity or has_capacity=False, do nothing
     # if not event_data.get("has_capacity", False):
@@ -460,86 +452,58 @@ async def promote_from_waitlist(update: Update, context: ContextTypes.DEFAULT_TY
     capacity = event_data["capacity"]
     
     # While there's capacity and the waitlist is not empty
-    while len(event_data["attendees"]) < capacity and event_data["waitlist"]:
-        print("promote_from_waitlist while loop")
-        
-        next_person = event_data["waitlist"].pop(0)
-        print("next_person", next_person)
+    while len(event_data["attendees"]) < capacity:
+        next_person = next_reachable_waitlisted(event_data)
+        if next_person is None:
+            break
+        remove_member(event_data, next_person["user_id"])
         
-        try:
-            print("promote_from_waitlist try DM")
-            promotion_text = (
-                f"{rsvp_header_text(event_data)}\n"
-                "A pup has cancelled and you are now RSVP'd to this event\. Press 'Cancel RSVP' if you can no longer attend\."
-            )
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("Cancel RSVP", callback_data=f"cancelrsvp:{event_data['id']}")]
-            ])
-            
-            dm_message = await context.bot.send_message(
-                chat_id=next_person["user_id"],
-                text=promotion_text,
-                parse_mode=ParseMode.MARKDOWN_V2,
-                reply_markup=keyboard,
-                disable_web_page_preview=True
-            )
-            
-            # Optionally edit their old waitlist message
-            try:
-                print("promote_from_waitlist edit old message")
-                edit_text = (
-                f"{rsvp_header_text(event_data)}\n"
-                "A pup has cancelled and you are now RSVP'd to this event\. Press 'Cancel RSVP' if you can no longer attend\."
-            )
-                await context.bot.edit_message_text(
-                    chat_id=next_person["user_id"],
-                    message_id=next_person["rsvp_message_id"],
-                    text=edit_text,
-                    parse_mode=ParseMode.MARKDOWN_V2,
-                    disable_web_page_preview=True
-                )
-            except Exception as ex:
-                print(f"[WaitlistPromotion] Could not edit user's old private message: {ex}")
-            
-            # update the user's data
-            next_person["rsvp_message_id"] = dm_message.message_id
-            
-            # add them to attendees
-            event_data["attendees"].append(next_person)
+        # add them to attendees
+        add_member(event_data, "attendees", next_person)
+        save_rsvp_promoted(context, event_data["id"], next_person)
         
-        except Exception as ex:
-            # If we cannot message them (blocked bot, etc.) continue with the next person
-            print(f"[WaitlistPromotion] Could not message user {next_person['user_id']} about promotion. Error: {ex}")
-    
-    # Save changes
-    update_event_attendees(event_data["id"], event_data, context)
+        promotion_text = (
+            f"{rsvp_header_text(event_data)}\n"
+            + escape_value("A pup has cancelled and you are now RSVP'd to this event. Press 'Cancel RSVP' if you can no longer attend.")
+        )
+        keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Cancel RSVP", callback_data=f"cancelrsvp:{event_data['id']}")]
+        ])
+        in_background(context, confirm_spot(update, context, event_data, next_person["user_id"], "attendees", promotion_text, keyboard, next_person.get("rsvp_message_id")))
     
     # Finally, update the posted announcement
     await update_announcement_message(update, context, event_data)
     return
+
+def next_reachable_waitlisted(event_data: dict):
+    """First entry on the waitlist whose user isn't known to be unreachable, or None."""
+    for entry in event_data["waitlist"]:
+        if not is_unreachable(entry["user_id"]):
+            return entry
+        metrics.increment("promotions_skipped_unreachable")
+    return None
+
+@answers_callback
+@serial_per_event
 async def cancel_waitlist_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Asks the user to confirm if they want to remove themselves from the waitlist.
     Warns them if there's more than one person on the waitlist that they will be at the end if they rejoin.
     """
     query = update.callback_query
-    await query.answer()  # Acknowledge the callback
 
     # 1. Parse event ID
     match = re.match(r"^cancelwaitlist:(\d+)$", query.data)
     if not match:
-        await query.answer("Invalid callback data", show_alert=False)
-        return
+        return "Invalid callback data", False
 
     event_id = int(match.group(1))
     user_id = query.from_user.id
 
     # 2. Retrieve the event
-    events = context.bot_data.get("events", [])
-    event_data = next((ev for ev in events if ev["id"] == event_id), None)
+    event_data = get_event(context, event_id)
     if not event_data:
-        await query.answer("Event not found.", show_alert=True)
-        return
+        return "Event not found.", True
 
     # Ensure "waitlist" field
     if "waitlist" not in event_data:
@@ -551,13 +515,15 @@ async def cancel_waitlist_callback(update: Update, context: ContextTypes.DEFAULT
     if waitlist_size > 1:
         text = (
             f"⚠️  {rsvp_header_text(event_data)}\n"
-            "There are other pups on the waitlist\. If you cancel and then want to rejoin, "
-            "you will be placed at the end of the line\. Are you sure you want to remove yourself from the waitlist\?"
+            + escape_value(
+                "There are other pups on the waitlist. If you cancel and then want to rejoin, "
+                "you will be placed at the end of the line. Are you sure you want to remove yourself from the waitlist?"
+            )
         )
     else:
         text = (
             f"⚠️  {rsvp_header_text(event_data)}\n"
-            "Are you sure you want to remove yourself from the waitlist\?"
+            + escape_value("Are you sure you want to remove yourself from the waitlist?")
         )
 
     buttons = [
@@ -567,46 +533,41 @@ async def cancel_waitlist_callback(update: Update, context: ContextTypes.DEFAULT
     keyboard = InlineKeyboardMarkup(buttons)
 
     # We store the old text (and optionally the keyboard) to restore if user chooses “keep waitlist”
-    for idx, w in enumerate(event_data["waitlist"]):
-        if w["user_id"] == user_id:
-            w["waitlist_message_text"] = query.message.text_markdown_v2
-            break
-
-    # Update the in-memory data
-    update_event_attendees(event_id, event_data, context)
+    list_name, w = find_member(event_data, user_id)
+    if list_name == "waitlist":
+        w["waitlist_message_text"] = query.message.text_markdown_v2
+        save_rsvp_updated(context, event_id, "waitlist", w)
 
-    await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=keyboard)
+    in_background(context, edit_pressed_message(query, text, keyboard))
+    return
 
+@answers_callback
+@serial_per_event
 async def keep_waitlist_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Restores the user's old waitlist confirmation message if they choose to keep their spot.
     """
     query = update.callback_query
-    await query.answer()
 
     # 1. Parse event ID
     match = re.match(r"^keepwaitlist:(\d+)$", query.data)
     if not match:
-        await query.answer("Invalid callback data", show_alert=False)
-        return
+        return "Invalid callback data", False
 
     event_id = int(match.group(1))
     user = query.from_user
     user_id = user.id
 
     # 2. Retrieve the event
-    events = context.bot_data.get("events", [])
-    event_data = next((ev for ev in events if ev["id"] == event_id), None)
+    event_data = get_event(context, event_id)
     if not event_data:
-        await query.answer("Event not found.", show_alert=True)
-        return
+        return "Event not found.", True
 
     # Find the user’s original waitlist message text
     old_text = None
-    for w in event_data["waitlist"]:
-        if w["user_id"] == user_id and "waitlist_message_text" in w:
-            old_text = w["waitlist_message_text"]
-            break
+    list_name, w = find_member(event_data, user_id)
+    if list_name == "waitlist":
+        old_text = w.get("waitlist_message_text")
 
     # If we found their old text, restore it
     if old_text:
@@ -614,129 +575,66 @@ async def keep_waitlist_callback(update: Update, context: ContextTypes.DEFAULT_T
         keyboard = InlineKeyboardMarkup([
             [InlineKeyboardButton("Cancel Waitlist", callback_data=f"cancelwaitlist:{event_id}")]
         ])
-        try:
-            await query.edit_message_text(old_text, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=keyboard,disable_web_page_preview=True)
-        except Exception as ex:
-            print(f"Could not restore old waitlist message: {ex}")
+        in_background(context, edit_pressed_message(query, old_text, keyboard))
     else:
         # If we didn't store old_text, just show a fallback
-        await query.edit_message_text("Kept your spot on the waitlist.")
+        in_background(context, edit_pressed_message(query, escape_value("Kept your spot on the waitlist.")))
     
     return
 
+@answers_callback
+@serial_per_event
 async def confirm_cancel_waitlist_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Removes the user from the waitlist if they confirm 'Yes, remove me from waitlist'.
     Then tries to promote from waitlist if capacity allows.
     """
     query = update.callback_query
-    await query.answer()
 
     # 1. Parse event ID
     match = re.match(r"^confirmcancelwaitlist:(\d+)$", query.data)
     if not match:
-        await query.answer("Invalid callback data", show_alert=False)
-        return
+        return "Invalid callback data", False
 
     event_id = int(match.group(1))
     user_id = query.from_user.id
 
     # 2. Retrieve the event
-    events = context.bot_data.get("events", [])
-    event_data = next((ev for ev in events if ev["id"] == event_id), None)
+    event_data = get_event(context, event_id)
     if not event_data:
-        await query.answer("Event not found.", show_alert=True)
-        return
-
-    attendees = event_data.get("attendees", [])
-    waitlist = event_data.get("waitlist", [])
-
-    was_in_waitlist = any(w["user_id"] == user_id for w in waitlist)
+        return "Event not found.", True
 
     # 3. Remove user from waitlist
-    new_waitlist = []
-    for w in waitlist:
-        if w["user_id"] == user_id:
-            continue
-        new_waitlist.append(w)
-    event_data["waitlist"] = new_waitlist
+    list_name, _ = find_member(event_data, user_id)
+    was_in_waitlist = list_name == "waitlist"
 
     # If user wasn't in the waitlist, no-op
     if not was_in_waitlist:
-        await query.edit_message_text(
-            "You have no waitlist spot to remove.",
-            parse_mode=ParseMode.MARKDOWN_V2
-        )
+        in_background(context, edit_pressed_message(query, escape_value("You have no waitlist spot to remove.")))
         return
 
-    # 4. Attempt to promote from waitlist
-    # (assuming you have a function promote_from_waitlist)
+    remove_member(event_data, user_id)
+    save_rsvp_removed(context, event_id, "waitlist", user_id)
+
+    # 4. Attempt to promote from waitlist, which also updates the posted announcement
     await promote_from_waitlist(update, context, event_data)
 
-    # 5. Update the event data
-    update_event_attendees(event_id, event_data, context)
+    # 5. Edit the user’s private message
+    text = (
+        f"❌  You have been removed from the waitlist for:\n"
+        f"{rsvp_header_text(event_data)}"
+    )
+    in_background(context, edit_pressed_message(query, text))
 
-    # 6. Update the posted announcement
-    await update_announcement_message(update, context, event_data)
-
-    # 7. Show ephemeral success
-    await query.answer("You have been removed from the waitlist.", show_alert=False)
-
-    # 8. Optionally edit the user’s private message
-    try:
-        text = (
-            f"❌  You have been removed from the waitlist for:\n"
-            f"{rsvp_header_text(event_data)}"
-        )
-        await query.edit_message_text(text, parse_mode=ParseMode.MARKDOWN_V2)
-    except Exception as ex:
-        print(f"Could not edit user’s private message: {ex}")
+    # 6. Show ephemeral success
+    return "You have been removed from the waitlist.", False
 
 
 
 async def update_announcement_message(update, context, event_data: dict):
     """
-    Re-generate the announcement text & keyboard using generate_announcement_message,
-    then edit both:
-      1. The channel’s announcement message (announcement_message_id).
-      2. The group’s RSVP button message (group_rsvp_button_message_id),
-         if it exists in event_data.
+    Ask for the channel announcement and the group RSVP button to be re-rendered.
+    Bursts of RSVPs are collapsed into one edit per message, see
+    event_admin/announcement_updates.py.
     """
-    from event_admin.announcement import generate_announcement_message, generate_group_rsvp_button
-    # 1. Generate new text & keyboard based on the updated event data
-    new_text, new_keyboard = generate_announcement_message(context, event_data_override=event_data)
-
-    # 2. First, update the announcement in the channel
-    try:
-        await context.bot.edit_message_text(
-            chat_id=event_data["announcement_message_chat_id"],
-            message_id=event_data["announcement_message_id"],
-            text=new_text,
-            parse_mode=ParseMode.MARKDOWN_V2,
-            reply_markup=new_keyboard,
-            disable_web_page_preview=True
-        )
-        print("[DEBUG] Channel announcement updated successfully.")
-    except Exception as ex:
-        print(f"[ERROR] Could not update channel announcement: {ex}")
-
-    # 3. Now, update the RSVP button in the group, if we have a stored message ID
-    group_chat_id = event_data.get("group_rsvp_button_chat_id")
-    group_msg_id  = event_data.get("group_rsvp_button_message_id")
-
-    if group_chat_id and group_msg_id:
-        try:
-            new_text, new_keyboard = generate_group_rsvp_button(context, event_data)
-            await context.bot.edit_message_text(
-                chat_id=group_chat_id,
-                message_id=group_msg_id,
-                text=new_text,        
-                parse_mode=ParseMode.MARKDOWN_V2,
-                reply_markup=new_keyboard,
-                disable_web_page_preview=True 
-            )
-            print("[DEBUG] Group RSVP button updated successfully.")
-        except Exception as ex:
-            print(f"[ERROR] Could not update group RSVP button: {ex}")
-    else:
-        print("[DEBUG] No group RSVP message to update.")
+    schedule_announcement_update(context, event_data["id"])
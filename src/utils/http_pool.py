@@ -0,0 +1,45 @@
+# utils/http_pool.py
+
+import importlib.util
+import time
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+from utils import metrics
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (`pip install "httpx[http2]"`)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class PooledRequest(HTTPXRequest):
+    """
+    HTTPXRequest that keeps track of how much of its connection pool is in use.
+    `name` tells the pools apart in /stats, e.g. "api" and "updates".
+    """
+
+    def __init__(self, name: str, connection_pool_size: int, **kwargs):
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+        self.name = name
+        self.pool_size = connection_pool_size
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def utilization(self) -> str:
+        """Requests in flight (including any waiting for a free connection) against the pool size."""
+        return f"{self.name}: {self.in_use} requests in flight, {self.pool_size} connections (peak {self.peak_in_use})"
+
+    async def do_request(self, *args, **kwargs):
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        started = time.perf_counter()
+        try:
+            return await super().do_request(*args, **kwargs)
+        except TimedOut as ex:
+            if "pool timeout" in str(ex).lower():
+                # Every connection was busy for longer than pool_timeout
+                metrics.increment(f"http_pool_timeouts_{self.name}")
+            raise
+        finally:
+            self.in_use -= 1
+            metrics.observe(f"http_request_{self.name}", time.perf_counter() - started)
@@ -0,0 +1,44 @@
+# utils/markdown.py
+
+import functools
+import re
+
+# Characters that must be escaped in MarkdownV2 text.
+# See: https://core.telegram.org/bots/api#markdownv2-style
+SPECIAL_CHARACTERS = "\\_*[]()~`>#+-=|{}.!"
+
+_ESCAPE_TABLE = str.maketrans({character: "\\" + character for character in SPECIAL_CHARACTERS})
+_NEEDS_ESCAPE = re.compile("[" + re.escape(SPECIAL_CHARACTERS) + "]")
+
+# str.translate is the fastest for short values such as names and usernames;
+# for long text a single regex substitution wins.
+_TRANSLATE_MAX_LENGTH = 256
+
+# Inside the (...) of an inline link only these have to be escaped.
+_LINK_ESCAPE_TABLE = str.maketrans({")": "\\)", "\\": "\\\\"})
+
+
+def escape_markdown_v2(text: str) -> str:
+    """
+    Escapes MarkdownV2 special characters in the given text. Text without any
+    of them is returned as it is, without making a copy.
+    """
+    if _NEEDS_ESCAPE.search(text) is None:
+        return text
+    if len(text) <= _TRANSLATE_MAX_LENGTH:
+        return text.translate(_ESCAPE_TABLE)
+    return _NEEDS_ESCAPE.sub(r"\\\g<0>", text)
+
+
+@functools.lru_cache(maxsize=4096)
+def escape_value(value: str) -> str:
+    """
+    escape_markdown_v2 for short values that are rendered over and over, such
+    as usernames and event names, so each is only escaped once.
+    """
+    return escape_markdown_v2(value)
+
+
+def escape_link_url(url: str) -> str:
+    """Escapes a URL for use in a MarkdownV2 inline link, [text](url)."""
+    return url.translate(_LINK_ESCAPE_TABLE)
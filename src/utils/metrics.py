@@ -0,0 +1,56 @@
+# utils/metrics.py
+
+import threading
+
+# In-process counters and timings. They are reset when the bot restarts and
+# can be viewed by event admins with the /stats command.
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+
+
+def increment(name: str, amount: int = 1) -> None:
+    """Add `amount` to the counter called `name`."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record one duration (in seconds) for the timing called `name`."""
+    with _lock:
+        timing = _timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+
+
+def get(name: str) -> int:
+    """Return the current value of a counter (0 if it was never incremented)."""
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def ratio(numerator: str, denominator: str) -> float:
+    """Return counter `numerator` divided by counter `denominator` (0 if the denominator is 0)."""
+    with _lock:
+        bottom = _counters.get(denominator, 0)
+        if not bottom:
+            return 0.0
+        return _counters.get(numerator, 0) / bottom
+
+
+def report() -> str:
+    """Build a plain text summary of every counter and timing."""
+    with _lock:
+        lines = []
+        for name in sorted(_counters):
+            lines.append(f"{name}: {_counters[name]}")
+        for name in sorted(_timings):
+            timing = _timings[name]
+            average = timing["total"] / timing["count"] * 1000
+            lines.append(
+                f"{name}: n={timing['count']} avg={average:.1f}ms max={timing['max'] * 1000:.1f}ms"
+            )
+    if not lines:
+        return "No metrics recorded yet."
+    return "\n".join(lines)
@@ -0,0 +1,68 @@
+# utils/offline.py
+
+import itertools
+import json
+import time
+from telegram.request import BaseRequest, RequestData
+
+
+class RecordingRequest(BaseRequest):
+    """
+    Request object that never contacts Telegram. Every Bot API call is
+    recorded in `calls` as (method, parameters) and answered the way Telegram
+    would answer it successfully: getMe with `bot_user` (a dict as Telegram
+    sends it), calls that send or edit a message with a made-up message, and
+    everything else with True.
+
+    Used by offline mode (`python src/main.py --offline`) so recorded updates
+    can be POSTed to the local webhook server without a real token.
+    """
+
+    def __init__(self, bot_user: dict, name: str = "offline"):
+        self.bot_user = bot_user
+        self.name = name
+        self.calls = []
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def utilization(self) -> str:
+        return f"{self.name}: {len(self.calls)} Bot API calls recorded, none sent"
+
+    async def do_request(self, url: str, method: str, request_data: RequestData = None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit("/", 1)[-1]
+        parameters = request_data.parameters if request_data is not None else {}
+        self.calls.append((api_method, parameters))
+        print(f"[Offline] {api_method} {json.dumps(parameters, default=str)}")
+        return 200, json.dumps({"ok": True, "result": self._result(api_method, parameters)}).encode()
+
+    def _result(self, api_method: str, parameters: dict):
+        if api_method == "getMe":
+            return self.bot_user
+        chat_id = parameters.get("chat_id")
+        if api_method == "getChat":
+            return _chat(chat_id)
+        if api_method.startswith(("send", "edit", "copy", "forward")) and chat_id is not None:
+            return {
+                "message_id": parameters.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": _chat(chat_id),
+                "from": self.bot_user,
+                "text": parameters.get("text", ""),
+            }
+        return True
+
+
+def _chat(chat_id) -> dict:
+    if isinstance(chat_id, int) and chat_id > 0:
+        return {"id": chat_id, "type": "private"}
+    return {"id": chat_id, "type": "supergroup", "title": "Offline chat"}
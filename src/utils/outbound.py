@@ -0,0 +1,214 @@
+# utils/outbound.py
+
+import asyncio
+import collections
+import time
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from utils import metrics
+
+# Priority lanes for outgoing requests. Pass one as `rate_limit_args` to a bot
+# method, e.g. `context.bot.send_message(..., rate_limit_args=PRIORITY_BULK)`.
+# Requests without one are treated as direct replies to a user.
+PRIORITY_RSVP = 0
+PRIORITY_ANNOUNCEMENT = 1
+PRIORITY_BULK = 2
+LANE_NAMES = ("rsvp", "announcement", "bulk")
+
+# Requests that don't send anything to a chat and are never throttled.
+UNLIMITED_ENDPOINTS = {"answerCallbackQuery", "getMe", "getChat", "getWebhookInfo", "setWebhook", "deleteWebhook"}
+
+# Seconds between looking for per-chat buckets that can be dropped.
+BUCKET_SWEEP_INTERVAL = 60
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        # Requests for this bucket that are waiting or being sent
+        self.in_use = 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_idle(self, now: float) -> bool:
+        """True if no request uses the bucket and it is as full as a new one, so it can be dropped."""
+        self._refill(now)
+        return self.in_use == 0 and now >= self.blocked_until and self.tokens >= self.capacity
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds`, after Telegram answered with RetryAfter."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class OutboundScheduler(BaseRateLimiter):
+    """
+    Rate limiter for every request the bot makes. Requests wait for a token
+    from the global bucket and from their chat's bucket, and higher priority
+    lanes are always served first, so RSVP confirmations are not stuck behind
+    a bulk message to all attendees. A RetryAfter from Telegram pauses the
+    affected bucket and the request is queued again.
+    """
+
+    def __init__(
+        self,
+        overall_rate: float = 30,
+        private_chat_rate: float = 1,
+        private_chat_burst: float = 3,
+        group_rate: float = 20 / 60,
+        group_burst: float = 20,
+        max_retries: int = 3,
+    ):
+        self._overall = TokenBucket(overall_rate, overall_rate)
+        self._private_chat_rate = private_chat_rate
+        self._private_chat_burst = private_chat_burst
+        self._group_rate = group_rate
+        self._group_burst = group_burst
+        self._max_retries = max_retries
+        # chat_id -> TokenBucket, for chats messaged recently
+        self._chats = {}
+        self._last_sweep = time.monotonic()
+        self._lanes = [collections.deque() for _ in LANE_NAMES]
+        self._wakeup = None
+        self._dispatcher = None
+
+    async def initialize(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for lane in self._lanes:
+            while lane:
+                _, _, future = lane.popleft()
+                future.cancel()
+
+    def _chat_bucket(self, chat_id):
+        if chat_id is None:
+            return None
+        now = time.monotonic()
+        if now - self._last_sweep >= BUCKET_SWEEP_INTERVAL:
+            self._drop_idle_buckets(now)
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Negative IDs are groups and channels
+            if isinstance(chat_id, str) or chat_id < 0:
+                bucket = TokenBucket(self._group_rate, self._group_burst)
+            else:
+                bucket = TokenBucket(self._private_chat_rate, self._private_chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _drop_idle_buckets(self, now: float) -> None:
+        """
+        Forget the buckets of chats that have not been messaged for a while.
+        A full, unused bucket behaves like a new one, so nothing is lost, and
+        the bot doesn't keep a bucket for every user it ever messaged.
+        """
+        self._last_sweep = now
+        idle = [chat_id for chat_id, bucket in self._chats.items() if bucket.is_idle(now)]
+        for chat_id in idle:
+            del self._chats[chat_id]
+        metrics.increment("outbound_buckets_dropped", len(idle))
+
+    def queue_depths(self) -> dict:
+        """Number of requests waiting in each lane."""
+        return {name: len(lane) for name, lane in zip(LANE_NAMES, self._lanes)}
+
+    async def _dispatch(self):
+        while True:
+            now = time.monotonic()
+            overall_wait = self._overall.wait_time(now)
+            if overall_wait == 0 and self._grant_next(now):
+                continue
+            # Nothing can be sent right now: sleep until a bucket refills or a new request arrives.
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_check(now, overall_wait))
+            except asyncio.TimeoutError:
+                pass
+
+    def _next_check(self, now: float, overall_wait: float):
+        """Seconds until a waiting request could be sent, or None if nothing is waiting."""
+        if not any(self._lanes):
+            return None
+        if overall_wait:
+            return overall_wait
+        return min(bucket.wait_time(now) for lane in self._lanes for _, bucket, _ in lane if bucket is not None)
+
+    def _grant_next(self, now: float) -> bool:
+        """Hand a token to the first waiting request (by lane, then age) whose chat is ready."""
+        for lane in self._lanes:
+            for position, (_, bucket, future) in enumerate(lane):
+                if future.done():
+                    del lane[position]
+                    return True
+                if bucket is None or bucket.wait_time(now) == 0:
+                    del lane[position]
+                    self._overall.take()
+                    if bucket is not None:
+                        bucket.take()
+                    future.set_result(None)
+                    return True
+        return False
+
+    async def _wait_for_turn(self, priority: int, bucket) -> None:
+        priority = min(max(priority, PRIORITY_RSVP), PRIORITY_BULK)
+        future = asyncio.get_running_loop().create_future()
+        queued_at = time.monotonic()
+        self._lanes[priority].append((queued_at, bucket, future))
+        self._wakeup.set()
+        await future
+        metrics.observe(f"outbound_wait_{LANE_NAMES[priority]}", time.monotonic() - queued_at)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint in UNLIMITED_ENDPOINTS:
+            return await callback(*args, **kwargs)
+
+        priority = rate_limit_args if isinstance(rate_limit_args, int) else PRIORITY_RSVP
+        bucket = self._chat_bucket(data.get("chat_id"))
+        if bucket is not None:
+            bucket.in_use += 1
+        try:
+            for attempt in range(self._max_retries + 1):
+                await self._wait_for_turn(priority, bucket)
+                try:
+                    return await callback(*args, **kwargs)
+                except RetryAfter as ex:
+                    metrics.increment("outbound_retry_after")
+                    if attempt == self._max_retries:
+                        raise
+                    retry_after = ex.retry_after.total_seconds() if hasattr(ex.retry_after, "total_seconds") else ex.retry_after
+                    # Telegram doesn't say which limit was hit; a chat that is
+                    # flooding only pauses itself, anything else pauses everyone.
+                    (bucket or self._overall).block(retry_after)
+                    self._wakeup.set()
+        finally:
+            if bucket is not None:
+                bucket.in_use -= 1
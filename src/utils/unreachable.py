@@ -0,0 +1,52 @@
+# utils/unreachable.py
+
+import time
+from telegram.error import BadRequest, Forbidden
+from config import config
+from utils import metrics
+
+# Seconds a user whose private chat could not be messaged is skipped for.
+# Sending /start to the bot clears it straight away.
+UNREACHABLE_TTL = getattr(config, "unreachable_user_ttl", 6 * 60 * 60)
+
+# user_id -> time.monotonic() when the user stops being skipped
+_unreachable = {}
+
+
+def is_unreachable_error(ex: Exception) -> bool:
+    """True if sending to the user failed because the bot can't message them at all."""
+    if isinstance(ex, Forbidden):
+        # The user never started the bot, blocked it or deleted their account
+        return True
+    return isinstance(ex, BadRequest) and "chat not found" in str(ex).lower()
+
+
+def mark_unreachable(user_id: int) -> None:
+    """Skip private messages to the user until UNREACHABLE_TTL has passed or they send /start."""
+    _unreachable[user_id] = time.monotonic() + UNREACHABLE_TTL
+    metrics.increment("unreachable_users_marked")
+
+
+def note_send_error(user_id: int, ex: Exception) -> bool:
+    """Mark the user if `ex` shows they can't be messaged. Returns whether they were marked."""
+    if is_unreachable_error(ex):
+        mark_unreachable(user_id)
+        return True
+    return False
+
+
+def is_unreachable(user_id: int) -> bool:
+    """True if a recent private message to the user failed and they haven't sent /start since."""
+    expires = _unreachable.get(user_id)
+    if expires is None:
+        return False
+    if time.monotonic() >= expires:
+        del _unreachable[user_id]
+        return False
+    return True
+
+
+def clear_unreachable(user_id: int) -> None:
+    """The user started a chat with the bot, so messages to them can work again."""
+    if _unreachable.pop(user_id, None) is not None:
+        metrics.increment("unreachable_users_cleared")
@@ -0,0 +1,179 @@
+# utils/webhook.py
+
+import asyncio
+import hmac
+import json
+import ssl
+import time
+import urllib.error
+import urllib.request
+from telegram import Update
+from utils import metrics
+
+# Largest request body accepted. Telegram updates are far smaller than this.
+MAX_BODY_SIZE = 1024 * 1024
+
+# Seconds an idle keep-alive connection is kept open.
+IDLE_TIMEOUT = 60
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class WebhookServer:
+    """
+    Minimal HTTP server that receives the updates Telegram pushes to the bot's
+    webhook. Accepted updates go into a bounded queue that `workers` tasks
+    hand to the application. When the queue is full the request is answered
+    with 503, so Telegram delivers the update again later instead of the bot
+    buffering without limit.
+
+    Plain HTTP is meant to run behind a reverse proxy that terminates TLS;
+    pass an `ssl_context` to serve HTTPS directly.
+    """
+
+    def __init__(self, application, listen: str, port: int, path: str, secret_token: str = None,
+                 queue_size: int = 100, workers: int = 64, ssl_context: ssl.SSLContext = None):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.workers = workers
+        self.ssl_context = ssl_context
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._server = None
+        self._worker_tasks = []
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve_connection, self.listen, self.port, ssl=self.ssl_context)
+        if not self.port:
+            # Port 0 lets the system pick a free port
+            self.port = self._server.sockets[0].getsockname()[1]
+        self._worker_tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        scheme = "https" if self.ssl_context else "http"
+        print(f"[Webhook] Listening on {scheme}://{self.listen}:{self.port}{self.path}")
+
+    async def stop(self) -> None:
+        """Stop accepting updates, then finish the ones already queued."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.queue.join()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    async def _work(self):
+        while True:
+            received, update = await self.queue.get()
+            metrics.observe("webhook_queue_wait", time.perf_counter() - received)
+            try:
+                await self.application.process_update(update)
+            except Exception as ex:
+                print(f"[Webhook] Error while processing update {update.update_id}: {ex}")
+            finally:
+                self.queue.task_done()
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), timeout=IDLE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    break
+                if request is None:
+                    break
+                status, keep_alive = self._handle(*request)
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    f"Content-Length: 0\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _handle(self, method: str, path: str, headers: dict, body: bytes):
+        """Returns the HTTP status for the request and whether to keep the connection open."""
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if body is None:
+            return 413, False
+        if path.split("?", 1)[0] != self.path:
+            return 404, keep_alive
+        if method != "POST":
+            return 405, keep_alive
+        if self.secret_token and not hmac.compare_digest(headers.get(SECRET_HEADER, ""), self.secret_token):
+            metrics.increment("webhook_updates_forbidden")
+            return 403, keep_alive
+
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except Exception as ex:
+            print(f"[Webhook] Could not parse update: {ex}")
+            return 400, keep_alive
+        if update is None:
+            return 400, keep_alive
+
+        try:
+            self.queue.put_nowait((time.perf_counter(), update))
+        except asyncio.QueueFull:
+            # Telegram retries deliveries that are not answered with 2xx
+            metrics.increment("webhook_updates_rejected")
+            return 503, keep_alive
+        metrics.increment("webhook_updates_received")
+        return 200, keep_alive
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """
+    Read one HTTP/1.1 request. Returns (method, path, headers, body), with a
+    body of None if it is too large, or None if the client closed the connection.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_SIZE:
+        return method, path, headers, None
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def post_updates(url: str, updates: list, secret_token: str = None) -> list:
+    """
+    POST recorded updates (dicts as Telegram sends them) to a webhook URL, e.g.
+    the bot's own local server, one request each. Returns the HTTP statuses.
+    """
+    statuses = []
+    for update in updates:
+        request = urllib.request.Request(url, data=json.dumps(update).encode(), method="POST")
+        request.add_header("Content-Type", "application/json")
+        if secret_token:
+            request.add_header("X-Telegram-Bot-Api-Secret-Token", secret_token)
+        try:
+            with urllib.request.urlopen(request) as response:
+                statuses.append(response.status)
+        except urllib.error.HTTPError as ex:
+            statuses.append(ex.code)
+    return statuses
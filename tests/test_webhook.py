@@ -0,0 +1,132 @@
+"""
+Tests for the built-in webhook server (utils/webhook.py) and offline mode
+(utils/offline.py). Updates are POSTed to a server on a free local port, as
+`python src/main.py --post-updates` does; nothing is sent to Telegram.
+"""
+
+import asyncio
+
+from telegram import Bot
+from telegram.ext import Application, CommandHandler
+
+from utils.offline import RecordingRequest
+from utils.webhook import WebhookServer, post_updates
+
+TOKEN = "123:offline"
+BOT_USER = {"id": 123, "is_bot": True, "first_name": "Test Bot", "username": "test_bot"}
+SECRET = "s3cret"
+
+START_UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 5,
+        "date": 1760000000,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Rex", "username": "rex"},
+        "text": "/start",
+        "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+    },
+}
+
+
+class RecordingApplication:
+    """Stands in for the Application: keeps the updates it is given."""
+
+    def __init__(self):
+        self.bot = Bot(TOKEN, request=RecordingRequest(BOT_USER))
+        self.updates = []
+
+    async def process_update(self, update):
+        self.updates.append(update)
+
+
+def update(update_id: int) -> dict:
+    return dict(START_UPDATE, update_id=update_id)
+
+
+async def post(server: WebhookServer, updates: list, path: str = None, secret_token: str = SECRET) -> list:
+    url = f"http://127.0.0.1:{server.port}{path or server.path}"
+    return await asyncio.to_thread(post_updates, url, updates, secret_token)
+
+
+def run_server(test, **kwargs):
+    """Run `test(server, application)` against a started server, then stop it."""
+    async def run():
+        application = RecordingApplication()
+        server = WebhookServer(application, "127.0.0.1", 0, "/telegram", secret_token=SECRET, **kwargs)
+        await server.start()
+        try:
+            await test(server, application)
+        finally:
+            await server.stop()
+        return application
+    return asyncio.run(run())
+
+
+def test_recorded_update_is_dispatched():
+    async def test(server, application):
+        assert await post(server, [update(1), update(2)]) == [200, 200]
+        await server.queue.join()
+
+    application = run_server(test)
+    assert [u.update_id for u in application.updates] == [1, 2]
+    assert application.updates[0].message.text == "/start"
+
+
+def test_wrong_secret_token_is_rejected():
+    async def test(server, application):
+        assert await post(server, [update(1)], secret_token="wrong") == [403]
+        assert await post(server, [update(2)], secret_token=None) == [403]
+
+    assert run_server(test).updates == []
+
+
+def test_full_queue_answers_503():
+    async def test(server, application):
+        # No workers, so the queue fills up and Telegram is asked to retry
+        assert await post(server, [update(1), update(2), update(3)]) == [200, 200, 503]
+        assert server.queue_depth() == 2
+        server.queue.get_nowait()
+        server.queue.task_done()
+        server.queue.get_nowait()
+        server.queue.task_done()
+
+    assert run_server(test, queue_size=2, workers=0).updates == []
+
+
+def test_wrong_path_is_rejected():
+    async def test(server, application):
+        assert await post(server, [update(1)], path="/other") == [404]
+
+    assert run_server(test).updates == []
+
+
+def test_offline_mode_replies_without_telegram():
+    """A whole Application in offline mode: no getMe and no replies reach Telegram."""
+    request = RecordingRequest(BOT_USER)
+
+    async def start(update, context):
+        await update.message.reply_text("Hello!")
+
+    async def run():
+        app = Application.builder().token(TOKEN).request(request).updater(None).build()
+        app.add_handler(CommandHandler("start", start))
+        server = WebhookServer(app, "127.0.0.1", 0, "/telegram", secret_token=SECRET)
+        await app.initialize()
+        await app.start()
+        await server.start()
+        try:
+            assert await post(server, [START_UPDATE]) == [200]
+            await server.queue.join()
+        finally:
+            await server.stop()
+            await app.stop()
+            await app.shutdown()
+        return app
+
+    app = asyncio.run(run())
+    assert app.bot.username == "test_bot"
+    methods = [method for method, _ in request.calls]
+    assert methods == ["getMe", "sendMessage"]
+    assert request.calls[1][1]["chat_id"] == 42
+    assert request.calls[1][1]["text"] == "Hello!"